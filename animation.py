@@ -0,0 +1,166 @@
+import math
+import random
+from array import array
+
+PARTICLES = 512  # Pool size; bursts beyond it are dropped, never allocated
+MAX_FRAME_MS = 100  # Longest step a particle takes, so a stall doesn't fling them
+# Particle motion, in board cells and seconds
+PARTICLE_GRAVITY = 30.0
+PARTICLE_DRAG = 1.5
+
+
+def linear(t):
+    return t
+
+
+def ease_out_cubic(t):
+    return 1 - (1 - t) ** 3
+
+
+class Tween:
+    # One reusable animation slot: eases from `begin` to `end` over `duration`
+    # ms, then holds `end` and calls `on_done` once
+    __slots__ = ('active', 'start', 'duration', 'begin', 'end', 'easing', 'value', 'on_done')
+
+    def __init__(self):
+        self.active = False
+        self.start = 0.0
+        self.duration = 1.0
+        self.begin = 0.0
+        self.end = 0.0
+        self.easing = linear
+        self.value = 0.0
+        self.on_done = None
+
+
+class ParticlePool:
+    # Fixed-size structure-of-arrays particle buffers. Live particles are packed
+    # at the front; a dead one is replaced by the last live one, so emitting
+    # and expiring never allocate.
+    def __init__(self, capacity=PARTICLES, seed=None):
+        self.capacity = capacity
+        self.count = 0
+        self.x = array('f', bytes(4 * capacity))
+        self.y = array('f', bytes(4 * capacity))
+        self.vx = array('f', bytes(4 * capacity))
+        self.vy = array('f', bytes(4 * capacity))
+        self.life = array('f', bytes(4 * capacity))  # Seconds left
+        self.ttl = array('f', bytes(4 * capacity))  # Seconds it started with
+        self.color = array('B', bytes(capacity))  # Index into the painter's palette
+        self.rng = random.Random(seed)
+
+    def emit(self, x, y, n, color, speed, life=0.6, angle=-math.pi / 2, spread=math.tau):
+        # Up to `n` particles at (x, y) heading within `spread` radians of
+        # `angle`; returns how many fit in the pool
+        rng = self.rng
+        n = min(n, self.capacity - self.count)
+        for i in range(self.count, self.count + n):
+            a = angle + (rng.random() - 0.5) * spread
+            v = speed * (0.4 + 0.6 * rng.random())
+            self.x[i] = x
+            self.y[i] = y
+            self.vx[i] = math.cos(a) * v
+            self.vy[i] = math.sin(a) * v
+            self.life[i] = self.ttl[i] = life * (0.6 + 0.4 * rng.random())
+            self.color[i] = color
+        self.count += n
+        return n
+
+    def step(self, dt):
+        x, y, vx, vy, life = self.x, self.y, self.vx, self.vy, self.life
+        drag = max(0.0, 1.0 - PARTICLE_DRAG * dt)
+        fall = PARTICLE_GRAVITY * dt
+        i = 0
+        while i < self.count:
+            life[i] -= dt
+            if life[i] <= 0:
+                self.count -= 1
+                self._move(self.count, i)
+                continue
+            vx[i] *= drag
+            vy[i] = vy[i] * drag + fall
+            x[i] += vx[i] * dt
+            y[i] += vy[i] * dt
+            i += 1
+
+    def _move(self, src, dst):
+        for buf in (self.x, self.y, self.vx, self.vy, self.life, self.ttl, self.color):
+            buf[dst] = buf[src]
+
+    def bounds(self):
+        # (left, top, right, bottom) around every live particle, or None
+        if not self.count:
+            return None
+        xs = self.x[:self.count]
+        ys = self.y[:self.count]
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def clear(self):
+        self.count = 0
+
+
+class AnimationManager:
+    # Named tween slots plus one particle pool, all advanced by the caller's
+    # frame clock (ms). Slots are created up front and restarted in place.
+    def __init__(self, slots, particles=PARTICLES):
+        self.slots = {name: Tween() for name in slots}
+        self.particles = ParticlePool(particles)
+        self.now = 0.0
+
+    def start(self, name, duration, begin=0.0, end=1.0, easing=linear, on_done=None, elapsed=0.0):
+        # `elapsed` resumes a tween that was already that far along
+        tween = self.slots[name]
+        tween.active = True
+        tween.start = self.now - elapsed
+        tween.duration = max(1.0, duration)
+        tween.begin = begin
+        tween.end = end
+        tween.easing = easing
+        tween.on_done = on_done
+        tween.value = begin + (end - begin) * easing(min(1.0, elapsed / tween.duration))
+
+    def stop(self, name, value=None):
+        # Stops without calling on_done, optionally parking the value
+        tween = self.slots[name]
+        tween.active = False
+        tween.on_done = None
+        if value is not None:
+            tween.value = value
+
+    def running(self, name):
+        return self.slots[name].active
+
+    def value(self, name):
+        return self.slots[name].value
+
+    def elapsed(self, name):
+        tween = self.slots[name]
+        return min(tween.duration, self.now - tween.start) if tween.active else 0.0
+
+    def reset(self, now):
+        self.now = now
+        for tween in self.slots.values():
+            tween.active = False
+            tween.on_done = None
+            tween.value = 0.0
+        self.particles.clear()
+
+    def advance(self, now):
+        dt = min(max(0.0, now - self.now), MAX_FRAME_MS)
+        self.now = now
+        finished = []
+        for tween in self.slots.values():
+            if not tween.active:
+                continue
+            t = min(1.0, (now - tween.start) / tween.duration)
+            tween.value = tween.begin + (tween.end - tween.begin) * tween.easing(t)
+            if t >= 1.0:
+                tween.active = False
+                finished.append(tween)
+        if self.particles.count:
+            self.particles.step(dt / 1000)
+        # Callbacks run last so they can restart their own slot
+        for tween in finished:
+            callback, tween.on_done = tween.on_done, None
+            if callback:
+                callback()
@@ -0,0 +1,126 @@
+import os
+import math
+from array import array
+
+AUDIO_ENV = 'MACAN_AUDIO'  # 'null' (or 0) for silent runs
+SAMPLE_RATE = 22050
+VOICES = 4  # Overlapping plays per effect before the oldest is cut off
+
+
+def synth(notes, volume=0.3, shape='square'):
+    # notes: (frequency start, frequency end, seconds) segments, played back to
+    # back; returns signed 16-bit mono PCM with a short fade on each segment
+    samples = array('h')
+    amplitude = int(32767 * volume)
+    fade = int(SAMPLE_RATE * 0.004)
+    phase = 0.0
+    for start, end, seconds in notes:
+        count = int(SAMPLE_RATE * seconds)
+        for i in range(count):
+            freq = start + (end - start) * i / count
+            phase += freq / SAMPLE_RATE
+            if shape == 'square':
+                value = 1.0 if phase % 1.0 < 0.5 else -1.0
+            else:
+                value = math.sin(2 * math.pi * phase)
+            envelope = min(1.0, i / fade, (count - i) / fade) * (1.0 - 0.6 * i / count)
+            samples.append(int(amplitude * value * envelope))
+    return samples.tobytes()
+
+
+def synthesize_effects():
+    return {
+        'move': synth([(880, 880, 0.025)], 0.12),
+        'line_clear': synth([(523, 523, 0.06), (659, 659, 0.06), (784, 784, 0.12)], 0.25),
+        'fever': synth([(220, 1320, 0.35), (1320, 1320, 0.15)], 0.25, 'sine'),
+    }
+
+
+class NullBackend:
+    # Plays nothing; counts triggers so headless runs can check them
+    name = 'null'
+
+    def __init__(self, effects, voices=VOICES):
+        self.played = dict.fromkeys(effects, 0)
+
+    def play(self, effect):
+        self.played[effect] += 1
+
+    def close(self):
+        pass
+
+
+class QtBackend:
+    # A fixed pool of QAudioSinks per effect, each pulling from a QBuffer over
+    # the effect's PCM. Qt streams the buffer on its own, so play() only
+    # rewinds and restarts a voice; nothing is allocated per trigger.
+    name = 'qt'
+
+    def __init__(self, effects, voices=VOICES):
+        from PySide6.QtCore import QBuffer, QByteArray, QIODevice
+        from PySide6.QtMultimedia import QAudioFormat, QAudioSink, QMediaDevices
+
+        device = QMediaDevices.defaultAudioOutput()
+        if device.isNull():
+            raise RuntimeError("no audio output device")
+        fmt = QAudioFormat()
+        fmt.setSampleRate(SAMPLE_RATE)
+        fmt.setChannelCount(1)
+        fmt.setSampleFormat(QAudioFormat.Int16)
+        if not device.isFormatSupported(fmt):
+            raise RuntimeError(f"{device.description()} can't play 16-bit mono")
+
+        self._data = {}
+        self.pools = {}
+        self.next_voice = {}
+        for effect, pcm in effects.items():
+            # QBuffers share the QByteArray's storage rather than copying it
+            data = self._data[effect] = QByteArray(pcm)
+            pool = []
+            for _ in range(voices):
+                buffer = QBuffer()
+                buffer.setData(data)
+                buffer.open(QIODevice.ReadOnly)
+                sink = QAudioSink(device, fmt)
+                sink.setBufferSize(int(SAMPLE_RATE * 2 * 0.02))  # 20ms
+                pool.append((sink, buffer))
+            self.pools[effect] = pool
+            self.next_voice[effect] = 0
+
+    def play(self, effect):
+        pool = self.pools[effect]
+        i = self.next_voice[effect]
+        self.next_voice[effect] = (i + 1) % len(pool)
+        sink, buffer = pool[i]
+        sink.stop()
+        buffer.seek(0)
+        sink.start(buffer)
+
+    def close(self):
+        for pool in self.pools.values():
+            for sink, buffer in pool:
+                sink.stop()
+                buffer.close()
+        self.pools = {}
+
+
+class AudioEngine:
+    # Effects are synthesized once up front; backends only ever replay them
+    def __init__(self, backend=None, voices=VOICES):
+        self.effects = synthesize_effects()
+        if backend is None:
+            backend = os.environ.get(AUDIO_ENV, 'qt').lower()
+        if backend in ('null', '0', 'off'):
+            self.backend = NullBackend(self.effects, voices)
+            return
+        try:
+            self.backend = QtBackend(self.effects, voices)
+        except Exception as e:
+            print(f"Audio error: {e}")
+            self.backend = NullBackend(self.effects, voices)
+
+    def play(self, effect):
+        self.backend.play(effect)
+
+    def close(self):
+        self.backend.close()
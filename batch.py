@@ -0,0 +1,361 @@
+import sys
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+from pieces import PIECE_TYPES, BOARD_WIDTH, BOARD_HEIGHT, build_piece_table, spawn_column
+from engine import GameEngine
+from gameloop import SPEED_UP_MS
+from bot import Weights
+
+
+class BatchRandom:
+    # PieceRandom for many seeds at once: game i draws the same pieces as
+    # PieceRandom(seeds[i]). uint64 arithmetic wraps like the masked ints there.
+    def __init__(self, seeds):
+        with np.errstate(over='ignore'):
+            z = np.asarray(seeds, dtype=np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+            z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z ^= z >> np.uint64(31)
+        z[z == 0] = 1
+        self.state = z
+
+    def choice(self, n, mask):
+        # Index in range(n) per game; only games in `mask` advance their state
+        x = self.state
+        x = x ^ (x >> np.uint64(12))
+        x ^= x << np.uint64(25)
+        x ^= x >> np.uint64(27)
+        self.state = np.where(mask, x, self.state)
+        with np.errstate(over='ignore'):
+            x = x * np.uint64(0x2545F4914F6CDD1D)
+        return (((x >> np.uint64(32)) * np.uint64(n)) >> np.uint64(32)).astype(np.int8)
+
+
+class PieceArrays:
+    # PIECE_TABLE flattened into arrays indexed [piece, rotation, slot], with
+    # pieces numbered as in PIECE_TYPES (cell value - 1). Slots are the four
+    # cells, or the (up to) four rows/columns of the bounding box.
+    def __init__(self, board_width):
+        table = build_piece_table(board_width)
+        shape = (len(PIECE_TYPES), 4)
+        self.cell_y = np.zeros(shape + (4,), np.intp)
+        self.cell_x = np.zeros(shape + (4,), np.intp)
+        self.width = np.zeros(shape, np.intp)
+        self.height = np.zeros(shape, np.intp)
+        # Lowest and highest filled row per column; unused columns get values
+        # that never win the min/max they feed into
+        self.bottoms = np.full(shape + (4,), -1 << 20, np.intp)
+        self.tops = np.full(shape + (4,), 1 << 20, np.intp)
+        # Cells per row and per column of the bounding box
+        self.row_cells = np.zeros(shape + (4,), np.intp)
+        self.col_cells = np.zeros(shape + (4,), np.intp)
+        for p, piece in enumerate(PIECE_TYPES):
+            for r, o in enumerate(table[piece]):
+                self.cell_y[p, r] = [y for y, x in o.cells]
+                self.cell_x[p, r] = [x for y, x in o.cells]
+                self.width[p, r] = o.width
+                self.height[p, r] = o.height
+                self.bottoms[p, r, :o.width] = o.bottoms
+                self.tops[p, r, :o.width] = o.tops
+                for y, x in o.cells:
+                    self.row_cells[p, r, y] += 1
+                    self.col_cells[p, r, x] += 1
+
+
+class BatchEngine:
+    # The GameEngine rules for N games in lockstep. Boards live in one
+    # (N, height, width) uint8 array of piece indices; every step places one
+    # piece per live game with a straight drop at the requested rotation and
+    # column, then locks, clears, scores and spawns across the whole batch.
+    # Column heights and per-row/per-column cell counts are kept alongside, so
+    # a step only touches the rows and columns under the pieces; whole boards
+    # are rebuilt only in games that cleared lines.
+    def __init__(self, n, width=BOARD_WIDTH, height=BOARD_HEIGHT, seed=0):
+        self.n = n
+        self.width = width
+        self.height = height
+        self.tables = PieceArrays(width)
+        self.games = np.arange(n)
+        self.new_games(seed)
+
+    def new_games(self, seed=0):
+        # Game i uses seed + i, so it can be compared with GameEngine(seed=seed + i)
+        n = self.n
+        self.seeds = np.arange(n, dtype=np.uint64) + np.uint64(seed)
+        self.rng = BatchRandom(self.seeds)
+        self.boards = np.zeros((n, self.height, self.width), np.uint8)
+        self.heights = np.zeros((n, self.width), np.intp)
+        self.row_counts = np.zeros((n, self.height), np.intp)
+        self.col_counts = np.zeros((n, self.width), np.intp)
+        self.score = np.zeros(n, np.int64)
+        self.lines_cleared = np.zeros(n, np.int64)
+        self.combo = np.zeros(n, np.int64)
+        self.max_combo = np.zeros(n, np.int64)
+        self.level = np.ones(n, np.int64)
+        self.speed = np.full(n, 1000, np.int64)
+        # Simulated play time in ms: each piece falls one row per gravity tick
+        # from the top and locks on the tick after it lands
+        self.clock = np.zeros(n, np.int64)
+        self.next_speed_up = np.full(n, SPEED_UP_MS, np.int64)
+        self.fevers = np.zeros(n, np.int64)
+        self.pieces_placed = np.zeros(n, np.int64)
+        self.game_over = np.zeros(n, bool)
+        everyone = np.ones(n, bool)
+        self.current = self.rng.choice(len(PIECE_TYPES), everyone)
+        self.next = self.rng.choice(len(PIECE_TYPES), everyone)
+        self.game_over |= self.check_spawn()
+
+    def check_collision(self, rotations, rows, cols, pieces=None):
+        # Per game, whether the piece at (row, col) leaves the board or overlaps a cell
+        t = self.tables
+        pieces = self.current if pieces is None else pieces
+        out = ((rows < 0) | (cols < 0) | (cols + t.width[pieces, rotations] > self.width)
+               | (rows + t.height[pieces, rotations] > self.height))
+        ys = np.clip(rows[:, None] + t.cell_y[pieces, rotations], 0, self.height - 1)
+        xs = np.clip(cols[:, None] + t.cell_x[pieces, rotations], 0, self.width - 1)
+        cells = (self.games[:, None] * self.height + ys) * self.width + xs
+        return out | (self.boards.reshape(-1)[cells] != 0).any(axis=1)
+
+    def check_spawn(self):
+        n = self.n
+        return self.check_collision(np.zeros(n, np.intp), np.zeros(n, np.intp),
+                                    np.full(n, spawn_column(self.width), np.intp))
+
+    def landing_rows(self, rotations, cols):
+        # Row a straight drop comes to rest at; negative when the piece doesn't fit
+        spans = np.minimum(cols[:, None] + np.arange(4), self.width - 1)
+        surface = self.height - np.take_along_axis(self.heights, spans, axis=1) - 1
+        return (surface - self.tables.bottoms[self.current, rotations]).min(axis=1)
+
+    def full_rows(self, land, p, r, row_counts, games):
+        # (N, 4) mask of the bounding-box rows the piece would complete
+        ys = np.minimum(land[:, None] + np.arange(4), self.height - 1)
+        rows = games[:, None] * self.height + ys
+        counts = row_counts.reshape(-1)[rows] + self.tables.row_cells[p, r]
+        return (counts == self.width) & (np.arange(4) < self.tables.height[p, r][:, None])
+
+    def step(self, rotations, cols):
+        # Drops each live game's current piece; columns are clamped to the board.
+        # Returns the number of lines each game cleared.
+        t = self.tables
+        live = ~self.game_over
+        rotations = np.asarray(rotations, np.intp) & 3
+        cols = np.clip(np.asarray(cols, np.intp), 0,
+                       self.width - t.width[self.current, rotations])
+        land = self.landing_rows(rotations, cols)
+        self.game_over |= live & (land < 0)
+        live &= land >= 0
+
+        # Lock. The per-game arrays are indexed through flat views, which is
+        # much cheaper than 2D fancy indexing at this size.
+        height, width = self.height, self.width
+        games = self.games[live]
+        p = self.current[live]
+        r = rotations[live]
+        land = land[live]
+        cols = cols[live]
+        ys = land[:, None] + t.cell_y[p, r]
+        xs = cols[:, None] + t.cell_x[p, r]
+        self.boards.reshape(-1)[(games[:, None] * height + ys) * width + xs] = (p + 1)[:, None]
+        lines = np.zeros(self.n, np.int64)
+        lines[games] = self.full_rows(land, p, r, self.row_counts, games).sum(axis=1)
+        row_counts = self.row_counts.reshape(-1)
+        col_counts = self.col_counts.reshape(-1)
+        heights = self.heights.reshape(-1)
+        for slot in range(4):
+            y = games * height + np.minimum(land + slot, height - 1)
+            row_counts[y] += t.row_cells[p, r, slot]
+            x = games * width + np.minimum(cols + slot, width - 1)
+            col_counts[x] += t.col_cells[p, r, slot]
+            heights[x] = np.maximum(heights[x], height - land - t.tops[p, r, slot])
+        self.pieces_placed += live
+        self.clock[games] += (land + 1) * self.speed[games]
+
+        # Clear: full rows sort to the top (stable, so the rest keep their order)
+        # and are zeroed
+        hit = np.flatnonzero(lines)
+        if len(hit):
+            self.compact(hit, lines[hit])
+
+        # Score as complete_clear() does; the combo resets on a lock without lines
+        cleared = lines > 0
+        self.combo = np.where(cleared, self.combo + 1, np.where(live, 0, self.combo))
+        self.max_combo = np.maximum(self.max_combo, self.combo)
+        self.score += lines * 100 * self.combo
+        self.lines_cleared += lines
+        self.level = self.lines_cleared // 10 + 1
+        self.fevers += lines == 4
+
+        # Spawn
+        self.current = np.where(live, self.next, self.current)
+        self.next = np.where(live, self.rng.choice(len(PIECE_TYPES), live), self.next)
+        self.game_over |= live & self.check_spawn()
+        return lines
+
+    def compact(self, games, lines):
+        height = self.height
+        rows = np.arange(height)
+        full = self.row_counts[games] == self.width
+        order = np.argsort(~full, axis=1, kind='stable')
+        gone = rows < lines[:, None]
+        boards = self.boards[games[:, None], order]
+        boards[gone] = 0
+        self.boards[games] = boards
+        row_counts = np.take_along_axis(self.row_counts[games], order, axis=1)
+        row_counts[gone] = 0
+        self.row_counts[games] = row_counts
+        # Every full row has one cell in each column, at or below the column's
+        # top, so columns simply drop by the lines cleared...
+        self.col_counts[games] -= lines[:, None]
+        heights = self.heights[games]
+        top = np.minimum(height - heights, height - 1)
+        top_cleared = np.take_along_axis(full, top, axis=1) & (heights > 0)
+        heights -= lines[:, None]
+        # ...unless the top cell itself was cleared, leaving gaps exposed below
+        g, x = np.nonzero(top_cleared)
+        if len(g):
+            column = boards[g, :, x] != 0
+            heights[g, x] = np.where(column.any(axis=1), height - column.argmax(axis=1), 0)
+        self.heights[games] = heights
+
+    def increase_speed(self, mask=None):
+        # The 30-second speed-up from GameEngine.increase_speed, for `mask` games
+        faster = np.maximum(100, (self.speed * 0.85).astype(np.int64))
+        due = self.speed > 100
+        if mask is not None:
+            due &= mask
+        self.speed = np.where(due, faster, self.speed)
+        return due
+
+    def apply_speed_ups(self, interval=SPEED_UP_MS):
+        # Fires the game loop's speed-up timer for every `interval` ms each
+        # game's clock has passed; the speed changes between pieces, not mid-fall
+        due = self.clock >= self.next_speed_up
+        while due.any():
+            self.increase_speed(due)
+            self.next_speed_up += np.where(due, interval, 0)
+            due = self.clock >= self.next_speed_up
+
+    def greedy_placements(self, weights=None):
+        # Best straight drop of the current piece per game under the bot's
+        # heuristic (no lookahead), tried for every rotation and column. Works
+        # from the heights and counts alone: a cleared row lowers every column
+        # by one, and holes per column are its height minus its cells.
+        w = weights or Weights()
+        t = self.tables
+        n, width = self.n, self.width
+        p = self.current
+        games = self.games
+        combo_bonus = w.combo * (self.combo + 1)
+        cells = self.col_counts.sum(axis=1)
+        best = np.full(n, -np.inf)
+        best_r = np.zeros(n, np.intp)
+        best_c = np.zeros(n, np.intp)
+        for r in range(4):
+            rotations = np.full(n, r, np.intp)
+            piece_width = t.width[p, r]
+            for c in range(width):
+                valid = c + piece_width <= width
+                cols = np.minimum(c, width - piece_width)
+                land = self.landing_rows(rotations, cols)
+                valid &= land >= 0
+                lines = self.full_rows(land, p, rotations, self.row_counts, games).sum(axis=1)
+                heights = self.heights.copy()
+                for slot in range(4):
+                    x = np.minimum(cols + slot, width - 1)
+                    heights[games, x] = np.maximum(heights[games, x],
+                                                   self.height - land - t.tops[p, r, slot])
+                heights -= lines[:, None]
+                aggregate = heights.sum(axis=1)
+                holes = aggregate - (cells + 4 - lines * width)
+                bumpiness = np.abs(np.diff(heights, axis=1)).sum(axis=1)
+                value = (w.height * aggregate + w.holes * holes + w.bumpiness * bumpiness
+                         + w.lines * lines + np.where(lines > 0, combo_bonus, 0))
+                value = np.where(valid, value, -np.inf)
+                better = value > best
+                best = np.where(better, value, best)
+                best_r[better] = r
+                best_c[better] = c
+        return best_r, best_c
+
+    def random_placements(self, rng):
+        return (rng.integers(0, 4, self.n), rng.integers(0, self.width, self.n))
+
+
+def play_one_at_a_time(seeds, moves, width=BOARD_WIDTH, height=BOARD_HEIGHT):
+    # The same placements and speed-up schedule through one GameEngine per
+    # game, for comparison with the batch. Returns the placements made.
+    placed = 0
+    for i, seed in enumerate(seeds):
+        engine = GameEngine(width, height, seed=int(seed))
+        engine.spawn_piece()
+        clock, next_speed_up = 0, SPEED_UP_MS
+        for rotations, cols in moves:
+            if engine.game_over:
+                break
+            engine.set_piece(engine.current_piece, int(rotations[i]) & 3)
+            engine.current_pos[1] = min(max(int(cols[i]), 0), width - engine.orientation.width)
+            if engine.check_collision() is True:
+                break
+            engine.hard_drop()
+            clock += (engine.current_pos[0] + 1) * engine.speed
+            while clock >= next_speed_up:
+                engine.increase_speed()
+                next_speed_up += SPEED_UP_MS
+            if engine.clear_lines():
+                engine.complete_clear()
+            engine.spawn_piece()
+            placed += 1
+    return placed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many headless games at once with NumPy")
+    parser.add_argument('-n', '--games', type=int, default=1000)
+    parser.add_argument('--pieces', type=int, default=500, help="placements per game")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--policy', choices=('greedy', 'random'), default='greedy')
+    parser.add_argument('--compare', type=int, default=0, metavar='GAMES',
+                        help="replay the first GAMES games one GameEngine at a time and "
+                             "report the speedup")
+    args = parser.parse_args(argv)
+
+    batch = BatchEngine(args.games, seed=args.seed)
+    rng = np.random.default_rng(args.seed)
+    compared = min(args.compare, args.games)
+    moves = []
+    elapsed = 0.0
+    for _ in range(args.pieces):
+        if batch.game_over.all():
+            break
+        if args.policy == 'greedy':
+            rotations, cols = batch.greedy_placements()
+        else:
+            rotations, cols = batch.random_placements(rng)
+        # Only the rules are timed, not the policy choosing the placements
+        started = perf_counter()
+        batch.step(rotations, cols)
+        batch.apply_speed_ups()
+        elapsed += perf_counter() - started
+        if compared:
+            moves.append((rotations[:compared], cols[:compared]))
+    placed = int(batch.pieces_placed.sum())
+    rate = placed / max(elapsed, 1e-9)
+    print(f"{args.games} games, {placed} placements in {elapsed:.2f}s ({rate:.0f} placements/s)")
+    print(f"score mean={batch.score.mean():.0f} max={batch.score.max()} "
+          f"lines mean={batch.lines_cleared.mean():.1f} max combo={batch.max_combo.max()} "
+          f"speed min={batch.speed.min()} game over={int(batch.game_over.sum())}")
+    if compared:
+        started = perf_counter()
+        single = play_one_at_a_time(batch.seeds[:compared], moves, batch.width, batch.height)
+        single_rate = single / max(perf_counter() - started, 1e-9)
+        print(f"one at a time: {single} placements ({single_rate:.0f} placements/s), "
+              f"batch is {rate / max(single_rate, 1e-9):.1f}x faster")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,323 @@
+import os
+import gc
+import sys
+import json
+import time
+import random
+import shutil
+import fnmatch
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+from time import perf_counter
+
+from pieces import PIECE_TYPES, BOARD_WIDTH, BOARD_HEIGHT
+from engine import GameEngine
+
+HERE = Path(__file__).resolve().parent
+BASELINE = HERE / 'bench-baseline.json'
+RESULTS = 'bench-results.json'
+
+# Filled rows (one random gap each) for the benchmark boards
+BOARDS = {'empty': 0, 'half': BOARD_HEIGHT // 2, 'nearly_full': BOARD_HEIGHT - 4}
+CLEAR_ROWS = 4  # Rows completed at the bottom for the clear benchmarks
+MIN_TIME = 0.02  # Seconds each timed run lasts at least
+REPEAT = 9
+STARTUP_RUNS = 3
+
+# Allowed slowdown against the baseline, as a fraction; first matching
+# pattern wins. Paints and startup are noisier than the engine paths.
+THRESHOLD = 0.25
+THRESHOLDS = {'startup.*': 0.5, 'paint.*': 0.4, 'frame.*': 0.4}
+
+
+def make_cells(filled, width=BOARD_WIDTH, height=BOARD_HEIGHT, full=0, seed=1):
+    # `filled` rows of random blocks from the floor up, each with one gap, the
+    # bottom `full` of them without
+    rng = random.Random(seed)
+    cells = [bytes(width)] * (height - filled)
+    for y in range(filled):
+        row = bytearray(rng.randrange(1, len(PIECE_TYPES) + 1) for _ in range(width))
+        if y < filled - full:
+            row[rng.randrange(width)] = 0
+        cells.append(bytes(row))
+    return cells
+
+
+def make_engine(cells, seed=1):
+    engine = GameEngine(len(cells[0]), len(cells), seed)
+    engine.set_cells(cells)
+    engine.spawn_piece()
+    return engine
+
+
+def measure(fn, setup=None, repeat=REPEAT, min_time=MIN_TIME):
+    # Per-call time in µs over `repeat` runs, each long enough to time; with
+    # `setup` only fn() itself is timed, after setup() before every call
+    def run(n):
+        if setup is None:
+            started = perf_counter()
+            for _ in range(n):
+                fn()
+            return perf_counter() - started
+        total = 0.0
+        for _ in range(n):
+            setup()
+            started = perf_counter()
+            fn()
+            total += perf_counter() - started
+        return total
+
+    n = 1
+    while run(n) < min_time and n < 1 << 24:
+        n *= 2
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        runs = [run(n) / n * 1e6 for _ in range(repeat)]
+    finally:
+        if enabled:
+            gc.enable()
+    return {'us': min(runs), 'median': statistics.median(runs), 'calls': n}
+
+
+def engine_benchmarks():
+    # Headless game rules on each board, as (name, fn, setup) for measure().
+    # Benchmarks are only measured when asked for; each board is set up
+    # just before its own.
+    for board, filled in BOARDS.items():
+        cells = make_cells(filled)
+        engine = make_engine(cells)
+        yield f'check_collision.{board}', engine.check_collision, None
+        yield f'rotate.{board}', engine.rotate, None
+
+        start = (engine.current_piece, list(engine.current_pos))
+
+        def reset(engine=engine, cells=cells, start=start):
+            engine.set_cells(cells)
+            engine.set_piece(start[0])
+            engine.current_pos[:] = start[1]
+        yield f'hard_drop.{board}', engine.hard_drop, reset
+
+        def land(engine=engine, reset=reset):
+            reset()
+            engine.current_pos[0] += engine.drop_distance()
+        yield f'lock_piece.{board}', engine.lock_piece, land
+
+        # Clearing the bottom rows of the same board, detection then removal
+        full = make_cells(max(filled, CLEAR_ROWS), full=CLEAR_ROWS)
+        clearing = make_engine(full)
+
+        def clear(engine=clearing):
+            engine.clear_lines()
+            engine.complete_clear()
+        yield f'clear_lines.{board}', clear, lambda: clearing.set_cells(full)
+
+
+def window_benchmarks(app):
+    # The window's handlers, saves and paints on the offscreen platform, as
+    # engine_benchmarks() yields them
+    import gui
+
+    window = gui.MacanTetrisNeo()
+    window.show()
+    app.processEvents()
+    window.frame_timer.stop()
+    window.hud_timer.stop()
+    board_widget = window.board_widget
+    engine = window.engine
+    try:
+        for board, filled in BOARDS.items():
+            cells = make_cells(filled)
+
+            def reset(cells=cells):
+                # A T piece at the spawn point of a running, unfrozen game
+                engine.set_cells(cells)
+                engine.pending_clears.clear()
+                engine.set_piece('T')
+                engine.current_pos[:] = [0, engine.spawn_col]
+                window.loop.frozen = False
+                board_widget.refresh_all()
+            reset()
+            app.processEvents()
+            yield f'fast_drop.{board}', window.fast_drop, reset
+
+            reset()
+            yield f'save_state.{board}', window.save_state, None
+            window.save_state(urgent=True)
+            window.writer.flush()
+            yield f'load_state.{board}', window.load_state, None
+
+            reset()
+            app.processEvents()
+            yield f'paint.{board}', board_widget.repaint, None
+
+            def invalidate():
+                board_widget._stack_key = None
+            yield f'paint.restack.{board}', board_widget.repaint, invalidate
+
+            # One frame of a piece sliding: the handler and its dirty repaint
+            moves = [window.move_left, window.move_right]
+
+            def slide():
+                moves.reverse()
+                moves[0]()
+                app.processEvents()
+            yield f'frame.move.{board}', slide, None
+    finally:
+        window.close()
+        app.processEvents()
+
+
+def startup_benchmarks(runs, env):
+    # `main.py --measure-startup` in fresh processes, median of each milestone
+    timings = {}
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, str(HERE / 'main.py'), '--measure-startup'],
+                             env=env, capture_output=True, text=True, timeout=120)
+        lines = out.stdout.strip().splitlines()
+        if out.returncode or not lines:
+            raise RuntimeError(f"startup run failed: {out.stderr.strip()[-500:]}")
+        for key, value in json.loads(lines[-1]).items():
+            timings.setdefault(key, []).append(value * 1000)
+    for key in ('first_frame', 'panels'):
+        if key in timings:
+            yield f'startup.{key}', {'us': statistics.median(timings[key]),
+                                     'median': statistics.median(timings[key]),
+                                     'calls': runs}
+
+
+def threshold_for(name, overrides, default=THRESHOLD):
+    # The first matching --threshold-for pattern, else the built-in noisy
+    # patterns, else the default
+    for pattern, value in [*overrides, *THRESHOLDS.items()]:
+        if fnmatch.fnmatch(name, pattern):
+            return value
+    return default
+
+
+def compare(results, baseline, default, overrides):
+    # Prints each benchmark against the baseline; returns the regressed names
+    regressions = []
+    print(f"{'benchmark':<28}{'baseline us':>13}{'now us':>11}{'change':>9}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:<28}{'-':>13}{result['us']:>11.2f}{'new':>9}")
+            continue
+        change = result['us'] / base['us'] - 1 if base['us'] else 0.0
+        limit = threshold_for(name, overrides, default)
+        flag = ''
+        if change > limit:
+            flag = f"  REGRESSION (limit {limit:+.0%})"
+            regressions.append(name)
+        print(f"{name:<28}{base['us']:>13.2f}{result['us']:>11.2f}{change:>+9.1%}{flag}")
+    return regressions
+
+
+def threshold_arg(text):
+    pattern, _, value = text.rpartition('=')
+    try:
+        value = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected PATTERN=FRACTION, not {text!r}") from None
+    if not pattern:
+        raise argparse.ArgumentTypeError(f"expected PATTERN=FRACTION, not {text!r}")
+    return pattern, value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the game's hot paths and rendering headless, and fail on "
+                    "slowdowns against a stored baseline")
+    parser.add_argument('--out', type=Path, default=Path(RESULTS),
+                        help=f"results JSON (default: {RESULTS})")
+    parser.add_argument('--baseline', type=Path, default=BASELINE,
+                        help="baseline JSON to compare against (default: bench-baseline.json "
+                             "next to this file)")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="store these results as the baseline instead of comparing")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help=f"allowed slowdown as a fraction (default {THRESHOLD})")
+    parser.add_argument('--threshold-for', type=threshold_arg, action='append', default=[],
+                        metavar='PATTERN=FRACTION',
+                        help="allowed slowdown for benchmarks matching a glob, e.g. 'paint.*=0.5'")
+    parser.add_argument('--only', action='append', metavar='PATTERN',
+                        help="run only benchmarks matching this glob (repeatable)")
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--startup-runs', type=int, default=STARTUP_RUNS,
+                        help="fresh processes timed to first frame (0 to skip)")
+    parser.add_argument('--no-qt', action='store_true', help="engine benchmarks only")
+    args = parser.parse_args(argv)
+
+    # Saves, the leaderboard and replays go to a throwaway home directory
+    # (also for the startup runs), audio is muted and Qt renders offscreen
+    home = tempfile.mkdtemp(prefix='macan-bench-')
+    os.environ.update(HOME=home, USERPROFILE=home, MACAN_AUDIO='null')
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    for name in ('MACAN_BOT', 'MACAN_PROFILE', 'MACAN_TELEMETRY'):
+        os.environ.pop(name, None)
+
+    def wanted(name):
+        return not args.only or any(fnmatch.fnmatch(name, p) for p in args.only)
+
+    results = {}
+
+    def record(name, result):
+        results[name] = result
+        print(f"{name:<28}{result['us']:>11.2f} us")
+
+    def collect(benchmarks):
+        for name, fn, setup in benchmarks:
+            if wanted(name):
+                record(name, measure(fn, setup, args.repeat))
+
+    qt_version = None
+    try:
+        collect(engine_benchmarks())
+        if not args.no_qt:
+            from PySide6 import __version__ as qt_version
+            from PySide6.QtWidgets import QApplication
+            app = QApplication.instance() or QApplication(sys.argv[:1])
+            collect(window_benchmarks(app))
+            if args.startup_runs and wanted('startup.*'):
+                for name, result in startup_benchmarks(args.startup_runs, dict(os.environ)):
+                    if wanted(name):
+                        record(name, result)
+    finally:
+        shutil.rmtree(home, ignore_errors=True)
+
+    report = {
+        'meta': {'python': platform.python_version(), 'platform': platform.platform(),
+                 'qt': qt_version, 'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'results': results,
+    }
+    args.out.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {args.out}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    try:
+        baseline = json.loads(args.baseline.read_text())['results']
+    except FileNotFoundError:
+        # A check with nothing to check against fails, so CI can't pass by accident
+        print(f"No baseline at {args.baseline}; run with --save-baseline to store one")
+        return 1
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Baseline error: {e}")
+        return 1
+    regressions = compare(results, baseline, args.threshold, args.threshold_for)
+    if regressions:
+        print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+        return 1
+    print("No regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,223 @@
+from engine import MOVE_LEFT, MOVE_RIGHT, ROTATE, HARD_DROP
+
+# Widest stretch of columns searched per piece; wider boards are searched in
+# a window of this many, so planning costs about the same on any board
+SEARCH_COLUMNS = 20
+
+
+class Weights:
+    # Heuristic weights; positive values reward the feature
+    def __init__(self, height=-0.51, lines=0.76, holes=-0.36, bumpiness=-0.18, combo=0.4):
+        self.height = height
+        self.lines = lines
+        self.holes = holes
+        self.bumpiness = bumpiness
+        self.combo = combo
+
+
+def drops(engine, piece, heights, lo=0, hi=None):
+    # Every distinct (orientation, column, landing row) for a straight drop,
+    # with the piece inside columns lo..hi-1
+    height = engine.height
+    if hi is None:
+        hi = engine.width
+    seen = set()
+    for o in engine.pieces[piece]:
+        if o.shape in seen:
+            continue
+        seen.add(o.shape)
+        bottoms = o.bottoms
+        for col in range(lo, hi - o.width + 1):
+            land = height
+            for c, bottom in enumerate(bottoms):
+                row = height - heights[col + c] - 1 - bottom
+                if row < land:
+                    land = row
+            if land >= 0:
+                yield o, col, land
+
+
+def place(rows, o, col, land, full_mask):
+    # Returns the rows after locking and clearing, and the number of lines cleared
+    rows = rows[:]
+    y = land
+    for m in o.col_masks[col]:
+        rows[y] |= m
+        y += 1
+    cleared = 0
+    for y in range(land, land + o.height):
+        if rows[y] == full_mask:
+            cleared += 1
+    if cleared:
+        # Also drops rows already full but still waiting out the clear animation
+        kept = [r for r in rows if r != full_mask]
+        rows = [0] * (len(rows) - len(kept)) + kept
+    return rows, cleared
+
+
+def column_heights(rows, width, top=0, mask=-1):
+    # Rows above `top` must be empty; tall boards then skip straight to the
+    # stack. Columns outside `mask` are left at 0.
+    heights = [0] * width
+    height = len(rows)
+    covered = 0
+    for y in range(top, height):
+        row = rows[y] & mask
+        new = row & ~covered
+        while new:
+            low = new & -new
+            heights[low.bit_length() - 1] = height - y
+            new ^= low
+        covered |= row
+    return heights
+
+
+def evaluate(rows, width, weights, top=0, lo=0, hi=None):
+    # Features of columns lo..hi-1 only (default all); a placement inside
+    # them leaves the rest unchanged but for line clears
+    if hi is None:
+        hi = width
+        mask = -1
+    else:
+        mask = ((1 << hi) - 1) ^ ((1 << lo) - 1)
+    heights = column_heights(rows, width, top, mask)[lo:hi]
+    holes = 0
+    covered = 0
+    for y in range(top, len(rows)):
+        row = rows[y] & mask
+        holes += bin(covered & ~row).count('1')
+        covered |= row
+    bumpiness = 0
+    for x in range(hi - lo - 1):
+        d = heights[x] - heights[x + 1]
+        bumpiness += d if d > 0 else -d
+    return weights.height * sum(heights) + weights.holes * holes + weights.bumpiness * bumpiness
+
+
+class AutoPlayer:
+    # Picks a placement for the current piece with one piece of lookahead
+    # (the next piece), then feeds inputs to reach it one at a time.
+    def __init__(self, weights=None, beam=6, columns=SEARCH_COLUMNS):
+        self.weights = weights or Weights()
+        self.beam = beam
+        self.columns = columns
+        self.target = None
+        self._planned_for = None
+        self._last = None
+
+    def score_move(self, cleared, combo):
+        w = self.weights
+        if cleared:
+            return w.lines * cleared + w.combo * (combo + 1)
+        return 0.0
+
+    def plan(self, engine):
+        # Returns (orientation, column) for the current piece, or None
+        width = engine.width
+        full = engine.full_mask
+        rows = engine.rows
+        heights = engine.heights
+        weights = self.weights
+        combo = engine.combo
+        # Everything above the stack is empty, and clears only move rows down
+        stack_top = engine.height - max(heights)
+        lo, hi = self.window(engine)
+        mask = ((1 << hi) - 1) ^ ((1 << lo) - 1)
+
+        candidates = []
+        spans = {}
+        for o, col, land in drops(engine, engine.current_piece, heights, lo, hi):
+            if o not in spans:
+                spans[o] = self.reach(engine, o, lo, hi)
+            span = spans[o]
+            if not span or not span[0] <= col <= span[1]:
+                continue
+            after, cleared = place(rows, o, col, land, full)
+            gain = self.score_move(cleared, combo)
+            top = min(stack_top, land)
+            candidates.append((gain + evaluate(after, width, weights, top, lo, hi), gain, o, col,
+                               after, combo + 1 if cleared else 0, top))
+        if not candidates:
+            return None
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        if not engine.next_piece:
+            return candidates[0][2], candidates[0][3]
+
+        best = None
+        for _, gain, o, col, after, next_combo, top in candidates[:self.beam]:
+            after_heights = column_heights(after, width, top, mask)
+            follow = None
+            for o2, col2, land2 in drops(engine, engine.next_piece, after_heights, lo, hi):
+                final, cleared2 = place(after, o2, col2, land2, full)
+                value = (self.score_move(cleared2, next_combo)
+                         + evaluate(final, width, weights, min(top, land2), lo, hi))
+                if follow is None or value > follow:
+                    follow = value
+            total = gain + (follow if follow is not None else -1e9)
+            if best is None or total > best[0]:
+                best = (total, o, col)
+        return best[1], best[2]
+
+    def window(self, engine):
+        # Columns lo..hi-1 to search: the whole board, or on wide boards the
+        # lowest stretch of `columns`, nearest the piece on ties
+        width = engine.width
+        if width <= self.columns:
+            return 0, width
+        n = self.columns
+        heights = engine.heights
+        cx = engine.current_pos[1]
+        total = sum(heights[:n])
+        best = (total, abs(cx - n // 2), 0)
+        for lo in range(1, width - n + 1):
+            total += heights[lo + n - 1] - heights[lo - 1]
+            key = (total, abs(cx - lo - n // 2), lo)
+            if key < best:
+                best = key
+        return best[2], best[2] + n
+
+    def reach(self, engine, o, lo=0, hi=None):
+        # The (first, last) columns, within lo..hi-1, that `o` can reach by
+        # rotating in place then shifting along the current row without
+        # hitting anything; None if it can't be placed at all
+        cy, cx = engine.current_pos
+        collides = engine.check_collision
+        if collides(o, cy, cx):
+            # Rotation may need a kick; then the piece is dropped where it is
+            if any(not collides(o, cy + dy, cx + dx) for dy, dx in o.kicks):
+                return cx, cx
+            return None
+        last = (engine.width if hi is None else hi) - o.width
+        first = cx
+        while first > lo and not collides(o, cy, first - 1):
+            first -= 1
+        end = cx
+        while end < last and not collides(o, cy, end + 1):
+            end += 1
+        return first, end
+
+    def next_input(self, engine):
+        # The next action towards the planned placement, replanning per piece
+        if engine.game_over or not engine.orientation:
+            return None
+        if self._planned_for != engine.pieces_placed:
+            self._planned_for = engine.pieces_placed
+            self.target = None
+            self.target = self.plan(engine)
+            self._last = None
+        if self.target is None:
+            return HARD_DROP
+        o, col = self.target
+        state = (engine.orientation, engine.current_pos[1])
+        if state == self._last:
+            # The previous input was blocked; take what we've got
+            return HARD_DROP
+        self._last = state
+        if engine.orientation.shape != o.shape:
+            return ROTATE
+        cx = engine.current_pos[1]
+        if cx < col:
+            return MOVE_RIGHT
+        if cx > col:
+            return MOVE_LEFT
+        return HARD_DROP
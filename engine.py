@@ -0,0 +1,399 @@
+import random
+from collections import deque
+
+from pieces import (PIECE_TYPES, BOARD_WIDTH, BOARD_HEIGHT, MIN_BOARD_SIZE, MAX_BOARD_WIDTH,
+                    MAX_BOARD_HEIGHT, GARBAGE_INDEX, build_piece_table, spawn_column)
+
+# Player and timer actions, as recorded in replays (must fit in 3 bits)
+MOVE_LEFT = 0
+MOVE_RIGHT = 1
+SOFT_DROP = 2
+ROTATE = 3
+HARD_DROP = 4
+GRAVITY = 5
+CLEAR = 6
+SPEED_UP = 7
+
+MASK64 = (1 << 64) - 1
+OCCUPIED_DIGITS = bytes([48] + [49] * 255)
+
+
+class PieceRandom:
+    # xorshift64* generator. Its whole state is one 64-bit int, so a save file
+    # can carry it and resume the exact piece sequence.
+    def __init__(self, seed=0):
+        # splitmix64 finaliser spreads small seeds across the state
+        z = (seed + 0x9E3779B97F4A7C15) & MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        self.state = (z ^ (z >> 31)) or 1
+
+    def next(self):
+        x = self.state
+        x ^= x >> 12
+        x ^= (x << 25) & MASK64
+        x ^= x >> 27
+        self.state = x
+        return (x * 0x2545F4914F6CDD1D) & MASK64
+
+    def choice(self, seq):
+        return seq[((self.next() >> 32) * len(seq)) >> 32]
+
+
+class GameEngine:
+    # Qt-free game rules. Each board row is an int bitmask (bit x = column x)
+    # with a parallel bytearray of piece indices used only for rendering.
+    # Locking, clearing and compaction only touch the rows that change, so
+    # large boards cost no more per piece than the standard one.
+    def __init__(self, width=BOARD_WIDTH, height=BOARD_HEIGHT, seed=None):
+        if not (MIN_BOARD_SIZE <= width <= MAX_BOARD_WIDTH
+                and MIN_BOARD_SIZE <= height <= MAX_BOARD_HEIGHT):
+            raise ValueError(f"Board must be {MIN_BOARD_SIZE}x{MIN_BOARD_SIZE} to "
+                             f"{MAX_BOARD_WIDTH}x{MAX_BOARD_HEIGHT}, not {width}x{height}")
+        self.width = width
+        self.height = height
+        self.full_mask = (1 << width) - 1
+        self.spawn_col = spawn_column(width)
+        self.pieces = build_piece_table(width)
+        self._empty_row = bytes(width)
+        # Bumped whenever locked cells change, for caches keyed on board contents
+        self.board_version = 0
+        # Span of rows changed since the renderer last asked; see take_changed_rows()
+        self.changed_rows = None
+        self.new_game(seed)
+
+    def new_game(self, seed=None):
+        # Each game draws its pieces from its own generator so it can be replayed
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.rng = PieceRandom(self.seed)
+        self.rows = [0] * self.height
+        self.cells = [bytearray(self.width) for _ in range(self.height)]
+        # Skyline: per column, number of rows from the floor to the top filled cell
+        self.heights = [0] * self.width
+        self.board_version += 1
+        self._changed_rows(0, self.height - 1)
+        # Rows the last locked piece covered: the only ones that can have filled
+        self._lock_rows = range(self.height)
+        self._ghost_key = None
+        self._ghost_row = 0
+        self.score = 0
+        self.level = 1
+        self.combo = 0
+        self.lines_cleared = 0
+        self.pieces_placed = 0
+        self.speed = 1000
+        self.current_piece = None
+        self.orientation = None
+        self.current_pos = [0, 0]
+        self.next_piece = None
+        self.game_over = False
+        # Full rows found by clear_lines() that complete_clear() hasn't removed yet
+        self.pending_clears = deque()
+
+    def set_cells(self, cells):
+        # Replaces the locked cells (rows of piece indices) and rebuilds the bitmasks
+        self.cells = [bytearray(row) for row in cells]
+        # Row bytes -> '0'/'1' digits, reversed so column 0 is the lowest bit
+        self.rows = [int(row.translate(OCCUPIED_DIGITS)[::-1], 2) for row in self.cells]
+        self._rebuild_heights()
+        self.board_version += 1
+        self._changed_rows(0, self.height - 1)
+        self._lock_rows = range(self.height)
+
+    def restore(self, other):
+        # Takes over the game held by `other`, an engine of the same size (one
+        # decoded from a save); caches keyed on board_version see a new board
+        version = max(self.board_version, other.board_version) + 1
+        self.__dict__.update(other.__dict__)
+        self.board_version = version
+        self.changed_rows = None
+        self._changed_rows(0, self.height - 1)
+
+    def _rebuild_heights(self):
+        self.heights = [0] * self.width
+        seen = 0
+        for y, row in enumerate(self.rows):
+            new = row & ~seen
+            while new:
+                low = new & -new
+                self.heights[low.bit_length() - 1] = self.height - y
+                new ^= low
+            seen |= row
+
+    def _changed_rows(self, first, last):
+        # Accumulates the span of rows whose cells changed since take_changed_rows()
+        if self.changed_rows:
+            first = min(first, self.changed_rows[0])
+            last = max(last, self.changed_rows[1])
+        self.changed_rows = (first, last)
+
+    def take_changed_rows(self):
+        # (first, last) rows changed since the previous call, or None
+        rows, self.changed_rows = self.changed_rows, None
+        return rows
+
+    @property
+    def current_shape(self):
+        return self.orientation.shape if self.orientation else None
+
+    def set_piece(self, piece_type, rotation=0):
+        self.current_piece = piece_type
+        self.orientation = self.pieces[piece_type][rotation]
+
+    def spawn_piece(self):
+        if self.next_piece:
+            piece_type = self.next_piece
+        else:
+            piece_type = self.rng.choice(PIECE_TYPES)
+        self.next_piece = self.rng.choice(PIECE_TYPES)
+
+        self.set_piece(piece_type)
+        self.current_pos[0] = 0
+        self.current_pos[1] = self.spawn_col
+
+        if self.check_collision():
+            self.game_over = True
+        return not self.game_over
+
+    def check_collision(self, orientation=None, cy=None, cx=None):
+        o = orientation or self.orientation
+        if cy is None:
+            cy = self.current_pos[0]
+        if cx is None:
+            cx = self.current_pos[1]
+        if cy < 0 or cx < 0 or cx >= len(o.col_masks) or cy + o.height > self.height:
+            return True
+        rows = self.rows
+        for m in o.col_masks[cx]:
+            if rows[cy] & m:
+                return True
+            cy += 1
+        return False
+
+    def move(self, dy, dx):
+        pos = self.current_pos
+        if self.check_collision(None, pos[0] + dy, pos[1] + dx):
+            return False
+        pos[0] += dy
+        pos[1] += dx
+        return True
+
+    def rotate(self):
+        o = self.pieces[self.current_piece][(self.orientation.rotation + 1) & 3]
+        pos = self.current_pos
+        for dy, dx in o.kicks:
+            if not self.check_collision(o, pos[0] + dy, pos[1] + dx):
+                self.orientation = o
+                pos[0] += dy
+                pos[1] += dx
+                return True
+        return False
+
+    def drop_distance(self):
+        cy, cx = self.current_pos
+        o = self.orientation
+        heights = self.heights
+        land = self.height
+        for col, bottom in enumerate(o.bottoms):
+            surface = self.height - heights[cx + col]
+            if cy + bottom >= surface:
+                # Tucked under an overhang; the skyline can't answer this one
+                return self._scan_drop_distance()
+            land = min(land, surface - 1 - bottom)
+        return land - cy
+
+    def _scan_drop_distance(self):
+        cy, cx = self.current_pos
+        dy = 0
+        while not self.check_collision(None, cy + dy + 1, cx):
+            dy += 1
+        return dy
+
+    def ghost_row(self):
+        # Landing row of the active piece, cached until the piece or board changes
+        key = (self.orientation, self.current_pos[0], self.current_pos[1], self.board_version)
+        if key != self._ghost_key:
+            self._ghost_key = key
+            self._ghost_row = self.current_pos[0] + self.drop_distance()
+        return self._ghost_row
+
+    def hard_drop(self):
+        self.current_pos[0] += self.drop_distance()
+        self.lock_piece()
+
+    def lock_piece(self):
+        cy, cx = self.current_pos
+        o = self.orientation
+        rows = self.rows
+        for i, m in enumerate(o.col_masks[cx]):
+            rows[cy + i] |= m
+        cells = self.cells
+        for y, x in o.cells:
+            cells[cy + y][cx + x] = o.index
+        heights = self.heights
+        for col, top in enumerate(o.tops):
+            h = self.height - cy - top
+            if h > heights[cx + col]:
+                heights[cx + col] = h
+        self.pieces_placed += 1
+        self.board_version += 1
+        self._lock_rows = range(cy, cy + o.height)
+        self._changed_rows(cy, cy + o.height - 1)
+
+    def clear_lines(self):
+        # Returns the newly full rows; resets the combo when there are none.
+        # Only the rows the last piece locked into can have filled, and rows
+        # still waiting in pending_clears aren't reported twice. With rows
+        # pending there is no active piece: the next one spawns only once
+        # they are removed, so it never collides with rows about to go.
+        full = self.full_mask
+        rows = self.rows
+        lines = [y for y in self._lock_rows if rows[y] == full]
+        for pending in self.pending_clears:
+            lines = [y for y in lines if y not in pending]
+        if lines:
+            self.pending_clears.append(lines)
+            self.current_piece = None
+            self.orientation = None
+        else:
+            self.combo = 0
+        return lines
+
+    def spawn_due(self):
+        # True when a clear has just finished and the next piece should spawn
+        return not self.orientation and not self.pending_clears and not self.game_over
+
+    def complete_clear(self):
+        # Removes and scores the oldest pending set of full rows, returning it
+        if not self.pending_clears:
+            return []
+        lines = self.pending_clears.popleft()
+        top = self.height - max(self.heights)
+        self._compact(lines, top)
+        self._update_heights(lines)
+        self.board_version += 1
+        self._changed_rows(top, max(lines))
+        # Rows still pending above the removed ones have moved down
+        for pending in self.pending_clears:
+            pending[:] = [y + sum(1 for line in lines if line > y) for y in pending]
+
+        self.lines_cleared += len(lines)
+        self.combo += 1
+
+        points = len(lines) * 100 * self.combo
+        self.score += points
+        self.level = self.lines_cleared // 10 + 1
+        return lines
+
+    def _compact(self, lines, top):
+        # Slides the rows between the stack top and the lowest cleared row down
+        # over the cleared ones by moving list slots; the cleared rows' buffers
+        # are wiped and reused as the newly empty rows. Rows above the stack
+        # are already empty and stay where they are.
+        rows, cells = self.rows, self.cells
+        cleared = set(lines)
+        freed = []
+        dst = max(lines)
+        for src in range(dst, top - 1, -1):
+            if src in cleared:
+                freed.append(cells[src])
+            else:
+                if src != dst:
+                    rows[dst] = rows[src]
+                    cells[dst] = cells[src]
+                dst -= 1
+        for row in freed:
+            row[:] = self._empty_row
+            rows[dst] = 0
+            cells[dst] = row
+            dst -= 1
+
+    def _update_heights(self, lines):
+        # Cleared rows are full, so they all sit at or below every column's top.
+        # A column only needs rescanning if its top cell was in a cleared row.
+        n = len(lines)
+        highest = min(lines)
+        rows = self.rows
+        heights = self.heights
+        for x in range(self.width):
+            top = self.height - heights[x]
+            if top != highest:
+                heights[x] -= n
+                continue
+            bit = 1 << x
+            heights[x] = 0
+            for y in range(top, self.height):
+                if rows[y] & bit:
+                    heights[x] = self.height - y
+                    break
+
+    def add_garbage(self, count, hole):
+        # Pushes `count` rows, full but for column `hole`, in from the floor;
+        # the stack rises with them. Call it between locking a piece and
+        # spawning the next. Blocks pushed off the top end the game, and
+        # False is returned.
+        count = min(count, self.height)
+        rows, cells = self.rows, self.cells
+        overflow = any(rows[:count])
+        # The top rows' buffers are reused as the garbage rows
+        freed = cells[:count]
+        del rows[:count]
+        del cells[:count]
+        mask = self.full_mask & ~(1 << hole)
+        for row in freed:
+            row[:] = bytes([GARBAGE_INDEX]) * self.width
+            row[hole] = 0
+            rows.append(mask)
+            cells.append(row)
+        if overflow:
+            self.game_over = True
+            self._rebuild_heights()
+        else:
+            heights = self.heights
+            for x in range(self.width):
+                if heights[x]:
+                    heights[x] += count
+                elif x != hole:
+                    heights[x] = count
+        for pending in self.pending_clears:
+            pending[:] = [y - count for y in pending]
+        self.board_version += 1
+        self._changed_rows(0, self.height - 1)
+        self._lock_rows = range(self.height)
+        return not self.game_over
+
+    def increase_speed(self):
+        if self.speed > 100:
+            self.speed = max(100, int(self.speed * 0.85))
+            return True
+        return False
+
+    def apply(self, action):
+        # Headless equivalent of the window's input and timer handlers. Returns
+        # the full rows when the action locked a piece, otherwise None; the
+        # next piece then waits for the CLEAR that removes them.
+        if action == CLEAR:
+            if self.complete_clear() and self.spawn_due():
+                self.spawn_piece()
+            return None
+        if action == SPEED_UP:
+            self.increase_speed()
+            return None
+        if self.game_over or not self.orientation:
+            return None
+        if action == MOVE_LEFT:
+            self.move(0, -1)
+        elif action == MOVE_RIGHT:
+            self.move(0, 1)
+        elif action == ROTATE:
+            self.rotate()
+        elif action == HARD_DROP or not self.move(1, 0):
+            if action == HARD_DROP:
+                self.hard_drop()
+            else:
+                self.lock_piece()
+            lines = self.clear_lines()
+            if not lines:
+                self.spawn_piece()
+            return lines
+        return None
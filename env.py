@@ -0,0 +1,193 @@
+import os
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from pieces import PIECE_INDEX, BOARD_WIDTH, BOARD_HEIGHT
+from engine import GameEngine, MOVE_LEFT, MOVE_RIGHT, SOFT_DROP, ROTATE, HARD_DROP, GRAVITY, CLEAR
+
+# Agent actions, in the engine's numbering
+ACTIONS = (MOVE_LEFT, MOVE_RIGHT, SOFT_DROP, ROTATE, HARD_DROP)
+
+# Observation layout (int32): the board row-major with 1 for locked cells and
+# 2 for the falling piece, then these features
+FEATURES = ('piece', 'rotation', 'row', 'col', 'next_piece', 'combo', 'level')
+
+
+def observation_size(width=BOARD_WIDTH, height=BOARD_HEIGHT):
+    return width * height + len(FEATURES)
+
+
+class TetrisEnv:
+    # reset()/step() wrapper around GameEngine. Line clears complete straight
+    # away (no flash) and the reward is the score they add, as complete_clear()
+    # scores them. With `gravity_every` set, a gravity tick follows every that
+    # many steps.
+    def __init__(self, width=BOARD_WIDTH, height=BOARD_HEIGHT, gravity_every=0, max_steps=0):
+        self.engine = GameEngine(width, height)
+        self.gravity_every = gravity_every
+        self.max_steps = max_steps
+        self.obs_size = observation_size(width, height)
+        self.steps = 0
+
+    def reset(self, seed=None, out=None):
+        self.engine.new_game(seed)
+        self.engine.spawn_piece()
+        self.steps = 0
+        return self.observe(out)
+
+    def step(self, action, out=None):
+        # Returns (observation, reward, done, info)
+        engine = self.engine
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown action {action}")
+        score = engine.score
+        lines = engine.apply(action)
+        self.steps += 1
+        if self.gravity_every and self.steps % self.gravity_every == 0 and not lines:
+            lines = engine.apply(GRAVITY)
+        if lines:
+            # Removes the rows and spawns the next piece
+            engine.apply(CLEAR)
+        done = engine.game_over or (self.max_steps and self.steps >= self.max_steps)
+        info = {'score': engine.score, 'lines': engine.lines_cleared,
+                'pieces': engine.pieces_placed}
+        return self.observe(out), engine.score - score, bool(done), info
+
+    def observe(self, out=None):
+        # Fills `out` (a fresh array if None) with the current observation
+        engine = self.engine
+        width, height = engine.width, engine.height
+        if out is None:
+            out = np.empty(self.obs_size, np.int32)
+        board = out[:width * height].reshape(height, width)
+        # From the piece grid rather than the row bitmasks, which outgrow int64
+        # on boards wider than 63
+        cells = np.frombuffer(b''.join(engine.cells), np.uint8).reshape(height, width)
+        np.not_equal(cells, 0, out=board, casting='unsafe')
+        o = engine.orientation
+        row, col = engine.current_pos
+        if o and not engine.game_over:
+            for y, x in o.cells:
+                board[row + y, col + x] = 2
+        out[width * height:] = (
+            o.index if o else 0, o.rotation if o else 0, row, col,
+            PIECE_INDEX.get(engine.next_piece, 0), engine.combo, engine.level)
+        return out
+
+
+def _worker(conn, shm_name, first, count, n, obs_size, options, seed):
+    # Steps sub-environments first..first+count-1, reading actions from and
+    # writing results straight into the shared buffers
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        obs, rewards, dones, actions = _views(shm.buf, n, obs_size)
+        envs = [TetrisEnv(**options) for _ in range(count)]
+        for i, env in enumerate(envs):
+            env.reset(None if seed is None else seed + first + i, obs[first + i])
+        conn.send('ready')
+        while True:
+            command = conn.recv()
+            if command == 'step':
+                for i, env in enumerate(envs):
+                    k = first + i
+                    _, rewards[k], dones[k], _ = env.step(int(actions[k]), obs[k])
+                    if dones[k]:
+                        env.reset(None, obs[k])
+                conn.send('ok')
+            elif command == 'reset':
+                for i, env in enumerate(envs):
+                    env.reset(None, obs[first + i])
+                conn.send('ok')
+            else:
+                break
+    finally:
+        del obs, rewards, dones, actions
+        shm.close()
+        conn.close()
+
+
+def _views(buf, n, obs_size):
+    # Observations, rewards, done flags and actions laid out in one block
+    obs = np.ndarray((n, obs_size), np.int32, buf)
+    offset = obs.nbytes
+    rewards = np.ndarray(n, np.float64, buf, offset)
+    offset += rewards.nbytes
+    dones = np.ndarray(n, np.bool_, buf, offset)
+    offset += -(-dones.nbytes // 8) * 8
+    actions = np.ndarray(n, np.int64, buf, offset)
+    return obs, rewards, dones, actions
+
+
+def _buffer_size(n, obs_size):
+    return n * obs_size * 4 + n * 8 + -(-n // 8) * 8 + n * 8
+
+
+class VectorEnv:
+    # N TetrisEnvs split across worker processes. Observations, rewards and
+    # done flags live in one shared-memory block that workers write in place;
+    # the arrays returned by reset()/step() are views of it, overwritten by the
+    # next call. Finished sub-environments reset themselves automatically.
+    def __init__(self, n, workers=None, seed=None, **options):
+        self.n = n
+        self.obs_size = observation_size(options.get('width', BOARD_WIDTH),
+                                         options.get('height', BOARD_HEIGHT))
+        workers = max(1, min(n, workers or os.cpu_count() or 1))
+        self._shm = shared_memory.SharedMemory(create=True, size=_buffer_size(n, self.obs_size))
+        self.observations, self.rewards, self.dones, self.actions = _views(
+            self._shm.buf, n, self.obs_size)
+        context = multiprocessing.get_context('spawn')
+        self._conns = []
+        self._procs = []
+        first = 0
+        for w in range(workers):
+            count = n // workers + (w < n % workers)
+            parent, child = context.Pipe()
+            proc = context.Process(target=_worker, daemon=True,
+                                   args=(child, self._shm.name, first, count, n,
+                                         self.obs_size, options, seed))
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+            first += count
+        for conn in self._conns:
+            conn.recv()
+
+    def _call(self, command):
+        for conn in self._conns:
+            conn.send(command)
+        for conn in self._conns:
+            conn.recv()
+
+    def reset(self):
+        self._call('reset')
+        return self.observations
+
+    def step(self, actions):
+        # Returns (observations, rewards, dones) for every sub-environment
+        self.actions[:] = actions
+        self._call('step')
+        return self.observations, self.rewards, self.dones
+
+    def close(self):
+        if not self._procs:
+            return
+        for conn in self._conns:
+            try:
+                conn.send('close')
+            except OSError:
+                pass
+        for proc in self._procs:
+            proc.join(5)
+        self._procs = []
+        del self.observations, self.rewards, self.dones, self.actions
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
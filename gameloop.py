@@ -0,0 +1,141 @@
+from engine import MOVE_LEFT, MOVE_RIGHT, SOFT_DROP
+
+STEP_MS = 1
+SPEED_UP_MS = 30000  # Speed up every 30s
+CLEAR_MS = 300  # Line-clear flash before the rows are removed; the game is frozen meanwhile
+# Longest stretch simulated in one go; beyond this the clock is assumed to have
+# been suspended (debugger, laptop sleep) rather than just a slow frame
+MAX_CATCH_UP_MS = 5000
+
+DAS_MS = 170
+ARR_MS = 50
+SOFT_DROP_FACTOR = 20
+
+
+class InputRepeater:
+    # Delayed auto shift for held keys, driven by the simulation clock instead
+    # of the OS key repeat. ARR 0 shifts straight to the wall.
+    def __init__(self, das=DAS_MS, arr=ARR_MS, soft_drop_factor=SOFT_DROP_FACTOR):
+        self.das = das
+        self.arr = arr
+        self.soft_drop_factor = soft_drop_factor
+        self.reset()
+
+    def reset(self):
+        self.held = []
+        self.shift = None
+        self.shift_timer = 0
+        self.charged = False
+        self.soft_drop = False
+        self.soft_timer = 0
+
+    def press(self, action):
+        if action in (MOVE_LEFT, MOVE_RIGHT):
+            if action in self.held:
+                self.held.remove(action)
+            self.held.append(action)
+            self._start_shift(action)
+        elif action == SOFT_DROP:
+            self.soft_drop = True
+            self.soft_timer = 0
+
+    def release(self, action):
+        if action in self.held:
+            self.held.remove(action)
+            if action == self.shift:
+                # Fall back to the other direction if it's still held
+                self._start_shift(self.held[-1] if self.held else None)
+        elif action == SOFT_DROP:
+            self.soft_drop = False
+
+    def _start_shift(self, action):
+        self.shift = action
+        self.shift_timer = 0
+        self.charged = False
+
+    def step(self, ms, gravity_interval, emit):
+        # `emit(action)` applies a move and returns whether it succeeded
+        if self.shift is not None:
+            self.shift_timer += ms
+            if not self.charged:
+                if self.shift_timer >= self.das:
+                    self.charged = True
+                    self.shift_timer = 0
+                    self._repeat(emit)
+            elif self.arr == 0 or self.shift_timer >= self.arr:
+                self.shift_timer = 0
+                self._repeat(emit)
+        if self.soft_drop:
+            self.soft_timer += ms
+            interval = max(1, gravity_interval // self.soft_drop_factor)
+            if self.soft_timer >= interval:
+                self.soft_timer -= interval
+                emit(SOFT_DROP)
+
+    def _repeat(self, emit):
+        if self.arr:
+            emit(self.shift)
+        else:
+            for _ in range(64):
+                if not emit(self.shift):
+                    break
+
+
+class FixedStepLoop:
+    # Accumulator-based fixed timestep. The caller feeds it wall-clock time
+    # once per frame; it runs however many simulation steps that covers, so a
+    # slow frame delays gravity ticks but never skips them.
+    def __init__(self, repeater, on_gravity, on_speed_up, on_input, step=STEP_MS):
+        self.repeater = repeater
+        self.on_gravity = on_gravity
+        self.on_speed_up = on_speed_up
+        self.on_input = on_input
+        self.step_ms = step
+        self.running = False
+        # While frozen, wall time passes without running steps
+        self.frozen = False
+        self.gravity_interval = 1000
+        self.gravity_phase = 0
+        self.speed_phase = 0
+        self._last = 0.0
+        self._accumulator = 0.0
+
+    def start(self, now, gravity_interval, gravity_phase=0, speed_phase=0):
+        # Times are in milliseconds; phases are time already spent in each period
+        self.running = True
+        self.frozen = False
+        self.gravity_interval = gravity_interval
+        self.gravity_phase = gravity_phase
+        self.speed_phase = speed_phase
+        self._last = now
+        self._accumulator = 0.0
+        self.repeater.reset()
+
+    def stop(self):
+        self.running = False
+        self.repeater.reset()
+
+    def advance(self, now):
+        # Returns the number of simulation steps run
+        if not self.running:
+            return 0
+        if self.frozen:
+            self._last = now
+            return 0
+        self._accumulator += min(now - self._last, MAX_CATCH_UP_MS)
+        self._last = now
+        steps = 0
+        step = self.step_ms
+        while self._accumulator >= step and self.running and not self.frozen:
+            self._accumulator -= step
+            steps += 1
+            self.repeater.step(step, self.gravity_interval, self.on_input)
+            self.gravity_phase += step
+            if self.gravity_phase >= self.gravity_interval:
+                self.gravity_phase -= self.gravity_interval
+                self.on_gravity()
+            self.speed_phase += step
+            if self.speed_phase >= SPEED_UP_MS:
+                self.speed_phase -= SPEED_UP_MS
+                self.on_speed_up()
+        return steps
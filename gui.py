@@ -0,0 +1,1611 @@
+import os
+import sys
+import json
+import time
+import random
+from collections import deque
+from time import perf_counter
+from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
+                               QHBoxLayout, QLabel, QFrame, QPushButton)
+from PySide6.QtCore import QTimer, Qt, QRect, QRectF, QSize, QObject, Signal
+from PySide6.QtGui import (QPainter, QColor, QPen, QFont, QFontMetrics, QLinearGradient, QPalette,
+                           QPixmap, QRegion, QImage)
+from pieces import SHAPES, PIECE_TYPES, BOARD_WIDTH, BOARD_HEIGHT
+from engine import (GameEngine, MOVE_LEFT, MOVE_RIGHT, SOFT_DROP, ROTATE, HARD_DROP,
+                    GRAVITY, CLEAR, SPEED_UP)
+from profiler import Profiler
+from replay import ReplayRecorder
+from storage import StateWriter, atomic_write, save_dir
+from savegame import SaveGame, SaveError, encode_save, decode_save, migrate_json
+from gameloop import InputRepeater, FixedStepLoop, DAS_MS, ARR_MS, SOFT_DROP_FACTOR, CLEAR_MS
+from animation import AnimationManager, ease_out_cubic
+from bot import AutoPlayer
+from audio import AudioEngine
+from leaderboard import Leaderboard, GameRecord, DEFAULT_PLAYER
+import telemetry
+import versus
+
+# Held keys handled by the game loop rather than the OS key repeat
+REPEAT_KEYS = {Qt.Key_Left: MOVE_LEFT, Qt.Key_Right: MOVE_RIGHT, Qt.Key_Down: SOFT_DROP}
+
+# Most recent replays kept in the save directory
+MAX_REPLAYS = 20
+# Top scores shown in the right panel
+LEADERBOARD_ROWS = 3
+
+COLORS = {
+    'I': QColor(0, 255, 255), 'O': QColor(255, 255, 0), 'T': QColor(255, 0, 255),
+    'S': QColor(0, 255, 0), 'Z': QColor(255, 0, 0), 'J': QColor(0, 0, 255), 'L': QColor(255, 165, 0)
+}
+GARBAGE_COLOR = QColor(128, 128, 160)
+# Indexed by the engine's piece grid values (0 is empty, GARBAGE_INDEX last)
+CELL_COLORS = [None] + [COLORS[p] for p in PIECE_TYPES] + [GARBAGE_COLOR]
+# Margin around cached block sprites so the glow pen isn't clipped
+SPRITE_PAD = 2
+# Cells smaller than this (in pixels) are drawn as flat fills without the grid
+SMALL_CELL = 8
+
+FEVER_MS = 3000
+FEVER_FADE_MS = 250
+# Particle colors: the piece colors by grid index, then the fever burst colors
+PARTICLE_COLORS = CELL_COLORS + [QColor(255, 255, 255), QColor(255, 255, 0)]
+SPARK_WHITE = len(CELL_COLORS)
+SPARK_YELLOW = SPARK_WHITE + 1
+
+
+def env_int(name, default):
+    # Integer tuning knob from the environment; bad values keep the default
+    value = os.environ.get(name, '')
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"{name} error: expected a whole number, got {value!r}")
+        return default
+
+
+class GlyphAtlas:
+    # Glowing glyphs pre-rendered once per font size, color and pixel ratio and
+    # shared by every label using them. Digits and score symbols are rendered
+    # up front, anything else the first time it's drawn.
+    PRELOAD = '0123456789x+-.,:!'
+    _atlases = {}
+
+    @classmethod
+    def get(cls, size, color, dpr=1.0):
+        key = (size, color, dpr)
+        atlas = cls._atlases.get(key)
+        if atlas is None:
+            atlas = cls._atlases[key] = cls(size, color, dpr)
+        return atlas
+
+    def __init__(self, size, color, dpr):
+        self.font = QFont("Courier New")
+        self.font.setStyleHint(QFont.Monospace)
+        self.font.setPixelSize(size)
+        self.font.setBold(True)
+        metrics = QFontMetrics(self.font)
+        self.advance = metrics.horizontalAdvance('0')
+        self.ascent = metrics.ascent()
+        self.line_height = metrics.height()
+        # Room around each glyph for its glow
+        self.pad = max(2, size // 3)
+        self.color = QColor(color)
+        self.dpr = dpr
+        self.glyphs = {}
+        for char in self.PRELOAD:
+            self.glyph(char)
+
+    def glyph(self, char):
+        pixmap = self.glyphs.get(char)
+        if pixmap is None:
+            pixmap = self.glyphs[char] = self.render(char)
+        return pixmap
+
+    def render(self, char):
+        w = self.advance + 2 * self.pad
+        h = self.line_height + 2 * self.pad
+        image = QImage(int(w * self.dpr), int(h * self.dpr), QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        
+        # Glow: the glyph drawn at quarter size and scaled back up smoothly
+        small = QImage(max(1, image.width() // 4), max(1, image.height() // 4),
+                       QImage.Format_ARGB32_Premultiplied)
+        small.fill(Qt.transparent)
+        painter = QPainter(small)
+        painter.scale(small.width() / w, small.height() / h)
+        self.draw_char(painter, char)
+        painter.end()
+        glow = small.scaled(image.width(), image.height(), Qt.IgnoreAspectRatio,
+                            Qt.SmoothTransformation)
+        
+        painter = QPainter(image)
+        painter.drawImage(0, 0, glow)
+        painter.drawImage(0, 0, glow)
+        painter.scale(self.dpr, self.dpr)
+        painter.setRenderHint(QPainter.TextAntialiasing)
+        self.draw_char(painter, char)
+        painter.end()
+        pixmap = QPixmap.fromImage(image)
+        pixmap.setDevicePixelRatio(self.dpr)
+        return pixmap
+
+    def draw_char(self, painter, char):
+        painter.setFont(self.font)
+        painter.setPen(self.color)
+        painter.drawText(self.pad, self.pad + self.ascent, char)
+
+class GlowLabel(QWidget):
+    # Monospace neon text painted from a GlyphAtlas. setText() repaints only
+    # the characters that changed, and the size hint is fixed at `chars`
+    # characters so value changes never trigger a layout pass.
+    def __init__(self, text, size=16, color='#00ffff', chars=0):
+        super().__init__()
+        self.font_size = size
+        self.color = color
+        self._text = str(text)
+        self.chars = max(chars, len(self._text))
+        self.alignment = Qt.AlignLeft
+        self.atlas = GlyphAtlas.get(size, color)
+
+    def text(self):
+        return self._text
+
+    def setAlignment(self, alignment):
+        self.alignment = alignment
+        self.update()
+
+    def sizeHint(self):
+        atlas = self.atlas
+        return QSize(self.chars * atlas.advance + 2 * atlas.pad, atlas.line_height + 2 * atlas.pad)
+
+    def minimumSizeHint(self):
+        return self.sizeHint()
+
+    def origin(self, text):
+        # Top-left of the first glyph's pixmap
+        atlas = self.atlas
+        x = 0
+        if self.alignment & Qt.AlignHCenter:
+            x = (self.width() - len(text) * atlas.advance) // 2 - atlas.pad
+        y = (self.height() - atlas.line_height) // 2 - atlas.pad
+        return x, y
+
+    def glyph_rect(self, index):
+        atlas = self.atlas
+        x, y = self.origin(self._text)
+        return QRect(x + index * atlas.advance, y, atlas.advance + 2 * atlas.pad,
+                     atlas.line_height + 2 * atlas.pad)
+
+    def setText(self, text):
+        text = str(text)
+        old = self._text
+        if text == old:
+            return
+        self._text = text
+        if len(text) > self.chars:
+            self.chars = len(text)
+            self.updateGeometry()
+        if len(text) != len(old):
+            self.update()
+            return
+        for i, (a, b) in enumerate(zip(old, text)):
+            if a != b:
+                self.update(self.glyph_rect(i))
+
+    def paintEvent(self, event):
+        dpr = self.devicePixelRatioF()
+        if self.atlas.dpr != dpr:
+            self.atlas = GlyphAtlas.get(self.font_size, self.color, dpr)
+        atlas = self.atlas
+        painter = QPainter(self)
+        x, y = self.origin(self._text)
+        clip = event.rect()
+        for char in self._text:
+            if char != ' ' and clip.intersects(QRect(x, y, atlas.advance + 2 * atlas.pad,
+                                                     atlas.line_height + 2 * atlas.pad)):
+                painter.drawPixmap(x, y, atlas.glyph(char))
+            x += atlas.advance
+        painter.end()
+
+class ArcadeBoard(QFrame):
+    def __init__(self, engine, profiler, particles):
+        super().__init__()
+        # Called once, after the first frame has been painted
+        self.on_first_frame = None
+        self.engine = engine
+        self.profiler = profiler
+        # Shared with the window's AnimationManager, which moves them
+        self.particles = particles
+        self._particle_rect = QRect()
+        # Set each frame from the window's animation slots (0 to 1)
+        self.fever_level = 0.0
+        self.flash_opacity = 0.0
+        self.clearing_lines = []
+        self._background = None
+        self._background_key = None
+        self._fever_layer = None
+        self._fever_key = None
+        self._stack = None
+        self._stack_key = None
+        self._last_footprint = QRegion()
+        # Pre-rendered blocks keyed by color, size, style and pixel ratio
+        self._sprites = {}
+        self.setMinimumSize(400, 600)
+        self.setStyleSheet('''
+            ArcadeBoard {
+                background-color: #0a0015;
+                border: 3px solid #00ffff;
+                border-radius: 10px;
+            }
+        ''')
+
+    def set_flash_opacity(self, value):
+        if value != self.flash_opacity:
+            self.flash_opacity = value
+            self.refresh_flash()
+
+    def set_fever_level(self, value):
+        if value != self.fever_level:
+            self.fever_level = value
+            self.refresh_all()
+
+    def paintEvent(self, event):
+        started = perf_counter()
+        super().paintEvent(event)
+        painter = QPainter(self)
+        
+        w, h = self.width(), self.height()
+        engine = self.engine
+        cell_w, cell_h = w / engine.width, h / engine.height
+        
+        region = event.region()
+        dpr = self.devicePixelRatioF()
+        
+        # Grid and fever glow, rebuilt only on resize
+        background_key = (w, h, dpr)
+        if background_key != self._background_key:
+            self._background_key = background_key
+            self._background = self.render_background(w, h, cell_w, cell_h)
+        fever = self.fever_level
+        if fever and background_key != self._fever_key:
+            self._fever_key = background_key
+            self._fever_layer = self.render_fever(w, h)
+        
+        # Placed blocks, rebuilt on resize; otherwise only the rows the engine
+        # changed since the last paint are redrawn into the layer
+        stack_key = (w, h, dpr)
+        changed = engine.take_changed_rows()
+        if stack_key != self._stack_key:
+            self._stack_key = stack_key
+            self._stack = self.render_stack(w, h, cell_w, cell_h)
+        elif changed:
+            self.update_stack(changed[0], changed[1], cell_w, cell_h)
+        
+        # Only blit the parts of the cached layers that were invalidated
+        for rect in region:
+            source = QRectF(rect.x() * dpr, rect.y() * dpr, rect.width() * dpr, rect.height() * dpr)
+            painter.drawPixmap(QRectF(rect), self._background, source)
+            if fever:
+                painter.setOpacity(fever)
+                painter.drawPixmap(QRectF(rect), self._fever_layer, source)
+                painter.setOpacity(1.0)
+            painter.drawPixmap(QRectF(rect), self._stack, source)
+        
+        # Draw current piece
+        if engine.orientation:
+            cy, cx = engine.current_pos
+            color = COLORS[engine.current_piece]
+            
+            # Ghost piece at the landing row
+            ghost_y = engine.ghost_row()
+            if ghost_y > cy:
+                for y, x in engine.orientation.cells:
+                    if region.intersects(self.cell_rect(cx + x, ghost_y + y, cell_w, cell_h)):
+                        self.draw_block(painter, cx + x, ghost_y + y, color, cell_w, cell_h, 'ghost')
+            
+            for y, x in engine.orientation.cells:
+                if region.intersects(self.cell_rect(cx + x, cy + y, cell_w, cell_h)):
+                    self.draw_block(painter, cx + x, cy + y, color, cell_w, cell_h, 'glow')
+        
+        # Draw flash effect for clearing lines
+        if self.clearing_lines and self.flash_opacity > 0:
+            painter.setOpacity(self.flash_opacity)
+            for line_y in self.clearing_lines:
+                line = QRect(0, int(line_y * cell_h), w, int(cell_h))
+                if region.intersects(line):
+                    painter.fillRect(line, Qt.white)
+            painter.setOpacity(1.0)
+        
+        particles = self.particles
+        if particles.count and region.intersects(self._particle_rect):
+            self.draw_particles(painter, cell_w, cell_h)
+        
+        if self.profiler.enabled and region.intersects(self.hud_rect()):
+            self.draw_hud(painter)
+        painter.end()
+        self.profiler.record('paint', started)
+        self.profiler.mark_present()
+        if self.on_first_frame:
+            callback, self.on_first_frame = self.on_first_frame, None
+            QTimer.singleShot(0, callback)
+
+    def hud_rect(self):
+        return QRect(6, 6, 250, 150)
+
+    def draw_hud(self, painter):
+        rect = self.hud_rect()
+        painter.fillRect(rect, QColor(0, 0, 0, 170))
+        painter.setPen(QColor(0, 255, 0))
+        painter.setFont(QFont("Courier New", 8))
+        lines = [f"{'ms':<14}{'p50':>7}{'p95':>7}{'p99':>7}"] + self.profiler.hud_lines()
+        for i, line in enumerate(lines):
+            painter.drawText(rect.x() + 6, rect.y() + 14 + i * 13, line)
+
+    def draw_particles(self, painter, cell_w, cell_h):
+        p = self.particles
+        x, y, life, ttl, color = p.x, p.y, p.life, p.ttl, p.color
+        size = max(2, int(min(cell_w, cell_h) / 6))
+        half = size // 2
+        for i in range(p.count):
+            painter.setOpacity(life[i] / ttl[i])
+            painter.fillRect(int(x[i] * cell_w) - half, int(y[i] * cell_h) - half, size, size,
+                             PARTICLE_COLORS[color[i]])
+        painter.setOpacity(1.0)
+
+    def refresh_hud(self):
+        self.update(self.hud_rect())
+
+    def refresh_particles(self):
+        # Repaints the particles' old and new bounding boxes after a step
+        bounds = self.particles.bounds()
+        rect = QRect()
+        if bounds:
+            cell_w, cell_h = self.width() / self.engine.width, self.height() / self.engine.height
+            left, top, right, bottom = bounds
+            pad = max(2, int(min(cell_w, cell_h) / 6))
+            rect = QRect(int(left * cell_w) - pad, int(top * cell_h) - pad,
+                         int((right - left) * cell_w) + 2 * pad, int((bottom - top) * cell_h) + 2 * pad)
+        if not (rect.isNull() and self._particle_rect.isNull()):
+            self.update(self._particle_rect | rect)
+        self._particle_rect = rect
+
+    def refresh_flash(self):
+        cell_h = self.height() / self.engine.height
+        for line_y in self.clearing_lines:
+            self.update(QRect(0, int(line_y * cell_h), self.width(), int(cell_h) + 1))
+
+    def cell_rect(self, x, y, cw, ch):
+        # Covers the cell plus the sprite's glow margin
+        return QRect(int(x * cw), int(y * ch), int(cw) + 2, int(ch) + 2)
+
+    def piece_footprint(self):
+        # Cells covered by the active piece and its ghost
+        region = QRegion()
+        engine = self.engine
+        if not engine.orientation:
+            return region
+        cell_w, cell_h = self.width() / engine.width, self.height() / engine.height
+        cy, cx = engine.current_pos
+        ghost_y = engine.ghost_row()
+        for y, x in engine.orientation.cells:
+            region += self.cell_rect(cx + x, cy + y, cell_w, cell_h)
+            region += self.cell_rect(cx + x, ghost_y + y, cell_w, cell_h)
+        return region
+
+    def refresh_piece(self):
+        # Repaint the piece's old and new footprint; locked cells are always
+        # inside the old one, since a piece locks where it was last drawn
+        footprint = self.piece_footprint()
+        self.update(self._last_footprint + footprint)
+        self._last_footprint = footprint
+
+    def refresh_rows(self):
+        # Repaints the rows a clear moved: from the top of the stack down to
+        # the lowest cleared row, as reported by the engine. The piece and its
+        # ghost usually sit above that band, and the ghost drops with the
+        # stack, so their old and new footprints are repainted as well.
+        changed = self.engine.changed_rows
+        region = QRegion()
+        if changed:
+            cell_h = self.height() / self.engine.height
+            top = int(changed[0] * cell_h)
+            region += QRect(0, top, self.width(), int((changed[1] + 1) * cell_h) + 2 - top)
+        footprint = self.piece_footprint()
+        self.update(region + self._last_footprint + footprint)
+        self._last_footprint = footprint
+
+    def refresh_all(self):
+        self.update()
+        self._last_footprint = self.piece_footprint()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._last_footprint = self.piece_footprint()
+
+    def new_layer(self, w, h):
+        dpr = self.devicePixelRatioF()
+        pixmap = QPixmap(int(w * dpr), int(h * dpr))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.transparent)
+        return pixmap
+
+    def render_background(self, w, h, cell_w, cell_h):
+        layer = self.new_layer(w, h)
+        painter = QPainter(layer)
+        
+        # Draw grid with glow
+        if min(cell_w, cell_h) >= SMALL_CELL:
+            pen = QPen(QColor(100, 100, 255, 40))
+            pen.setWidth(1)
+            painter.setPen(pen)
+            for i in range(self.engine.height + 1):
+                y = i * cell_h
+                painter.drawLine(0, int(y), w, int(y))
+            for i in range(self.engine.width + 1):
+                x = i * cell_w
+                painter.drawLine(int(x), 0, int(x), h)
+        
+        painter.end()
+        return layer
+
+    def render_fever(self, w, h):
+        # Fever mode glow, painted over the grid at the current fever_level
+        layer = self.new_layer(w, h)
+        painter = QPainter(layer)
+        gradient = QLinearGradient(0, 0, w, h)
+        gradient.setColorAt(0, QColor(255, 0, 255, 30))
+        gradient.setColorAt(1, QColor(0, 255, 255, 30))
+        painter.fillRect(0, 0, w, h, gradient)
+        painter.end()
+        return layer
+
+    def render_stack(self, w, h, cell_w, cell_h):
+        layer = self.new_layer(w, h)
+        painter = QPainter(layer)
+        self.draw_rows(painter, 0, self.engine.height - 1, cell_w, cell_h)
+        painter.end()
+        return layer
+
+    def update_stack(self, first, last, cell_w, cell_h):
+        # Wipes and redraws rows first..last of the cached stack layer
+        painter = QPainter(self._stack)
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        painter.fillRect(QRectF(0, first * cell_h, self.width(), (last - first + 1) * cell_h),
+                         Qt.transparent)
+        painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
+        self.draw_rows(painter, first, last, cell_w, cell_h)
+        painter.end()
+
+    def draw_rows(self, painter, first, last, cell_w, cell_h):
+        # Walks the set bits of each row mask, so empty cells cost nothing
+        engine = self.engine
+        for y in range(first, last + 1):
+            mask = engine.rows[y]
+            row_cells = engine.cells[y]
+            while mask:
+                low = mask & -mask
+                x = low.bit_length() - 1
+                mask ^= low
+                self.draw_block(painter, x, y, CELL_COLORS[row_cells[x]], cell_w, cell_h)
+
+    def draw_block(self, painter, x, y, color, cw, ch, style='block'):
+        if cw < SMALL_CELL or ch < SMALL_CELL:
+            # Too small for sprites to read; flat cells, ghosts dimmed
+            if style == 'ghost':
+                painter.setOpacity(0.35)
+            painter.fillRect(QRectF(x * cw, y * ch, cw, ch), color)
+            painter.setOpacity(1.0)
+            return
+        sprite = self.block_sprite(color, int(cw - 4), int(ch - 4), style)
+        painter.drawPixmap(int(x * cw + 2) - SPRITE_PAD, int(y * ch + 2) - SPRITE_PAD, sprite)
+
+    def block_sprite(self, color, bw, bh, style):
+        key = (color.rgba(), bw, bh, style, self.devicePixelRatioF())
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            return sprite
+        
+        sprite = self.new_layer(bw + 2 * SPRITE_PAD, bh + 2 * SPRITE_PAD)
+        painter = QPainter(sprite)
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = QRect(SPRITE_PAD, SPRITE_PAD, bw, bh)
+        if style == 'ghost':
+            ghost_color = QColor(color)
+            ghost_color.setAlpha(110)
+            painter.setPen(QPen(ghost_color, 2))
+            painter.setBrush(Qt.NoBrush)
+            painter.drawRect(rect.adjusted(1, 1, -1, -1))
+        else:
+            # Outer glow
+            if style == 'glow':
+                glow_color = QColor(color)
+                glow_color.setAlpha(100)
+                painter.setPen(QPen(glow_color, 3))
+            else:
+                painter.setPen(Qt.NoPen)
+            
+            painter.setBrush(color)
+            painter.drawRect(rect)
+            
+            # Inner highlight
+            highlight = QColor(255, 255, 255, 80)
+            painter.fillRect(SPRITE_PAD + 2, SPRITE_PAD + 2, bw - 4, int((bh - 4) / 3), highlight)
+        painter.end()
+        self._sprites[key] = sprite
+        return sprite
+
+class LeaderboardSignals(QObject):
+    # Carries snapshots from the leaderboard thread to the GUI thread
+    updated = Signal(object)
+
+
+class LeaderboardPanel(QFrame):
+    def __init__(self, rows=LEADERBOARD_ROWS):
+        super().__init__()
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+        layout.addWidget(GlowLabel("LEADERBOARD", 14, '#00ffff'))
+        self.rows = [GlowLabel("", 10, '#ffffff', chars=20) for _ in range(rows)]
+        for label in self.rows:
+            layout.addWidget(label)
+        self.today = GlowLabel("", 10, '#ffff00', chars=20)
+        layout.addWidget(self.today)
+        self.player_best = GlowLabel("", 10, '#ff00ff', chars=20)
+        layout.addWidget(self.player_best)
+
+    def show_snapshot(self, snapshot):
+        top = snapshot['top']
+        for rank, label in enumerate(self.rows, 1):
+            if rank <= len(top):
+                name, score = top[rank - 1][:2]
+                label.setText(f"{rank}.{name[:10]:<10}{score:>8}")
+            else:
+                label.setText(f"{rank}.{'-' * 10}{'':>8}")
+        today = snapshot['today']
+        self.today.setText(f"TODAY {today[0][0][:6]:<6}{today[0][1]:>8}" if today else "TODAY -")
+        best = snapshot['player_best']
+        self.player_best.setText(f"{'YOUR BEST':<12}{best:>8}" if best else "YOUR BEST -")
+
+
+class NextPieceWidget(QFrame):
+    def __init__(self):
+        super().__init__()
+        self.next_piece = None
+        self.next_shape = None
+        self.setFixedSize(120, 120)
+        self.setStyleSheet('''
+            NextPieceWidget {
+                background-color: rgba(10, 0, 30, 150);
+                border: 2px solid #ff00ff;
+                border-radius: 8px;
+            }
+        ''')
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.next_shape or not self.next_piece:
+            return
+        
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        
+        rows, cols = len(self.next_shape), len(self.next_shape[0])
+        cell_size = min(100 / cols, 100 / rows)
+        offset_x = (120 - cols * cell_size) / 2
+        offset_y = (120 - rows * cell_size) / 2
+        
+        color = COLORS[self.next_piece]
+        for y, row in enumerate(self.next_shape):
+            for x, val in enumerate(row):
+                if val:
+                    rect = QRect(int(offset_x + x * cell_size), int(offset_y + y * cell_size),
+                                int(cell_size - 2), int(cell_size - 2))
+                    painter.setBrush(color)
+                    painter.setPen(Qt.NoPen)
+                    painter.drawRect(rect)
+
+class OpponentBoard(QFrame):
+    # The versus opponent's board, drawn flat from the rows they sync
+    def __init__(self):
+        super().__init__()
+        self.opponent = None
+        self.setFixedSize(210, 410)
+        self.setStyleSheet('''
+            OpponentBoard {
+                background-color: rgba(10, 0, 30, 150);
+                border: 2px solid #ff0000;
+                border-radius: 8px;
+            }
+        ''')
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        opponent = self.opponent
+        if not opponent:
+            return
+        painter = QPainter(self)
+        cell = min((self.width() - 10) / opponent.width, (self.height() - 10) / opponent.height)
+        left = (self.width() - cell * opponent.width) / 2
+        top = (self.height() - cell * opponent.height) / 2
+        size = max(1.0, cell - 1)
+        for y, mask in enumerate(opponent.rows):
+            while mask:
+                low = mask & -mask
+                x = low.bit_length() - 1
+                mask ^= low
+                painter.fillRect(QRectF(left + x * cell, top + y * cell, size, size), GARBAGE_COLOR)
+        o = opponent.orientation
+        if o:
+            cy, cx = opponent.pos
+            for y, x in o.cells:
+                painter.fillRect(QRectF(left + (cx + x) * cell, top + (cy + y) * cell, size, size),
+                                 COLORS[o.piece])
+        painter.end()
+
+class SpeedMeter(QFrame):
+    def __init__(self):
+        super().__init__()
+        self.speed_level = 1
+        self.setFixedSize(30, 300)
+        self.setStyleSheet('''
+            SpeedMeter {
+                background-color: rgba(10, 0, 30, 150);
+                border: 2px solid #ff0000;
+                border-radius: 5px;
+            }
+        ''')
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        
+        fill_height = int((self.speed_level / 20) * 290)
+        gradient = QLinearGradient(0, 290, 0, 0)
+        gradient.setColorAt(0, QColor(0, 255, 0))
+        gradient.setColorAt(0.5, QColor(255, 255, 0))
+        gradient.setColorAt(1, QColor(255, 0, 0))
+        
+        painter.fillRect(5, 295 - fill_height, 20, fill_height, gradient)
+
+class MacanTetrisNeo(QMainWindow):
+    # With deferred_ui the window starts with just the board and the game
+    # running; the side panels, overlays and audio are built after the first
+    # frame is on screen. Boards other than 10x20 get a resizable window and
+    # their own save file. Finished games go to the leaderboard under `player`.
+    # With a versus `link` the window plays rounds against the opponent on
+    # the other end instead (see versus.py).
+    def __init__(self, deferred_ui=False, startup_clock=None, width=BOARD_WIDTH,
+                 height=BOARD_HEIGHT, player=None, link=None):
+        super().__init__()
+        # Startup milestones, read from `startup_clock` (ms since process start)
+        self.startup_clock = startup_clock
+        self.timings = {}
+        self.panels_ready = False
+        self._hud_values = None
+        self.speed_level = 1
+        self.audio = None
+        self.setWindowTitle("MACAN TETRIS NEO - ARCADE MODE")
+        self.large_board = (width, height) != (BOARD_WIDTH, BOARD_HEIGHT)
+        self.link = link
+        window_width = 1250 if link else 1000
+        if self.large_board:
+            self.setMinimumSize(window_width, 700)
+        else:
+            self.setFixedSize(window_width, 700)
+        
+        # Game state
+        self.engine = GameEngine(width, height)
+        self.high_score = 0
+        self.game_active = False
+        self.fever_mode_active = False
+        
+        # One precise frame timer drives a fixed-step simulation loop that owns
+        # gravity, speed-ups and held-key repeats (MACAN_DAS/ARR/SDF to tune)
+        self.repeater = InputRepeater(env_int('MACAN_DAS', DAS_MS),
+                                      env_int('MACAN_ARR', ARR_MS),
+                                      env_int('MACAN_SDF', SOFT_DROP_FACTOR))
+        self.loop = FixedStepLoop(self.repeater, self.game_tick, self.increase_speed,
+                                  self.repeat_input)
+        self.frame_timer = QTimer()
+        self.frame_timer.setTimerType(Qt.PreciseTimer)
+        self.frame_timer.timeout.connect(self.advance_frame)
+        refresh_rate = QApplication.primaryScreen().refreshRate() if QApplication.primaryScreen() else 60
+        self.frame_interval = max(1, int(1000 / (refresh_rate or 60)))
+        # Line-clear flashes, fever timing and particles run on the same frame
+        # clock, so they pause with it and need no Qt timers or animations
+        self.animations = AnimationManager(('flash', 'fever', 'fever_glow'))
+        
+        # Profiling HUD (F3 or MACAN_PROFILE=1)
+        self.profiler = Profiler()
+        self.hud_timer = QTimer()
+        self.hud_timer.timeout.connect(self.refresh_profiler_hud)
+        
+        # Autoplayer for attract mode and soak tests (F2 or MACAN_BOT=1). It feeds
+        # the normal input handlers, one input every MACAN_BOT_DELAY ms.
+        self.bot = AutoPlayer()
+        self.bot_active = os.environ.get('MACAN_BOT', '') not in ('', '0')
+        self.bot_delay = env_int('MACAN_BOT_DELAY', 50)
+        self.bot_next = 0.0
+        
+        # Saves are written off the GUI thread
+        self.save_path = self.get_save_path()
+        self.writer = StateWriter()
+        
+        # Game history in SQLite, also written off the GUI thread (MACAN_PLAYER
+        # names the player); snapshots come back through a queued signal
+        self.player = player or os.environ.get('MACAN_PLAYER') or DEFAULT_PLAYER
+        self.max_combo = 0
+        self.game_started = perf_counter()
+        self.leaderboard_snapshot = None
+        self.leaderboard_signals = LeaderboardSignals()
+        self.leaderboard_signals.updated.connect(self.show_leaderboard)
+        self.leaderboard = Leaderboard(self.save_path.with_name('leaderboard.db'), self.player,
+                                       f'{width}x{height}', self.leaderboard_signals.updated.emit,
+                                       [self.save_path.with_name('state.json')], LEADERBOARD_ROWS)
+        
+        # Opt-in binary event log (MACAN_TELEMETRY), buffered and written off
+        # the GUI thread
+        directory = telemetry.telemetry_from_env()
+        self.telemetry = telemetry.TelemetryWriter(directory) if directory else None
+        # Where each piece with rows still pending locked, oldest first, for
+        # their CLEAR records; the next piece has spawned by then
+        self.lock_placement = None
+        self.clear_placements = deque()
+        
+        # Versus rounds start when both players are READY. Messages are
+        # polled once a frame; our board goes out as row deltas when it
+        # changes, and cleared lines go out as garbage rows.
+        self.status_text = "GAME OVER"
+        self.opponent = None
+        self.board_sync = versus.BoardSync()
+        self.incoming_garbage = 0
+        self.garbage_rng = random.Random()
+        self.link_open = link is not None
+        if link:
+            link.send(versus.hello(self.player, width, height))
+            self.versus_timer = QTimer()
+            self.versus_timer.setTimerType(Qt.PreciseTimer)
+            self.versus_timer.timeout.connect(self.versus_step)
+        
+        self.init_ui()
+        if deferred_ui:
+            self.board_widget.on_first_frame = self.build_panels
+        else:
+            self.build_panels()
+        # Versus rounds aren't saved or resumed; garbage cells don't fit the
+        # save format
+        save = None if link else self.load_state()
+        if link:
+            self.restart()
+            self.versus_timer.start(self.frame_interval)
+        elif save and save.active:
+            self.resume_game(save)
+        else:
+            self.new_game()
+        if self.profiler.enabled:
+            self.hud_timer.start(250)
+
+    def init_ui(self):
+        # Dark gradient background
+        palette = QPalette()
+        gradient = QLinearGradient(0, 0, 0, 700)
+        gradient.setColorAt(0, QColor(10, 0, 30))
+        gradient.setColorAt(1, QColor(30, 0, 60))
+        palette.setBrush(QPalette.Window, gradient)
+        self.setPalette(palette)
+        
+        central = QWidget()
+        self.setCentralWidget(central)
+        main_layout = QHBoxLayout(central)
+        main_layout.setSpacing(20)
+        main_layout.setContentsMargins(20, 20, 20, 20)
+        
+        # Side panels are filled in by build_panels()
+        self.left_panel = QVBoxLayout()
+        self.right_panel = QVBoxLayout()
+        
+        # Center - Board
+        self.center_layout = QVBoxLayout()
+        self.board_widget = ArcadeBoard(self.engine, self.profiler, self.animations.particles)
+        self.center_layout.addWidget(self.board_widget)
+        
+        # Assemble layout
+        main_layout.addLayout(self.left_panel, 1)
+        main_layout.addLayout(self.center_layout, 2)
+        main_layout.addLayout(self.right_panel, 1)
+        if self.link:
+            self.opponent_panel = QVBoxLayout()
+            main_layout.addLayout(self.opponent_panel, 1)
+        self.main_layout = main_layout
+
+    def build_panels(self):
+        # Sound effects, pre-rendered into a voice pool (MACAN_AUDIO=null to mute)
+        self.audio = AudioEngine()
+        
+        # Left panel
+        left_panel = self.left_panel
+        self.title_label = GlowLabel("MACAN TETRIS NEO", 24, '#ff00ff')
+        self.title_label.setAlignment(Qt.AlignCenter)
+        left_panel.addWidget(self.title_label)
+        
+        left_panel.addSpacing(20)
+        left_panel.addWidget(GlowLabel("SCORE", 14, '#00ffff'))
+        self.score_label = GlowLabel("0", 28, '#ffffff', chars=8)
+        left_panel.addWidget(self.score_label)
+        
+        left_panel.addSpacing(10)
+        left_panel.addWidget(GlowLabel("LEVEL", 14, '#00ffff'))
+        self.level_label = GlowLabel("1", 28, '#ffffff', chars=3)
+        left_panel.addWidget(self.level_label)
+        
+        left_panel.addSpacing(10)
+        left_panel.addWidget(GlowLabel("HIGH SCORE", 14, '#ff00ff'))
+        self.high_score_label = GlowLabel("0", 20, '#ffff00', chars=8)
+        left_panel.addWidget(self.high_score_label)
+        
+        left_panel.addSpacing(10)
+        left_panel.addWidget(GlowLabel("COMBO", 14, '#00ffff'))
+        self.combo_label = GlowLabel("x0", 20, '#ff0000', chars=4)
+        left_panel.addWidget(self.combo_label)
+        
+        left_panel.addSpacing(20)
+        left_panel.addWidget(GlowLabel("NEXT PIECE", 14, '#00ffff'))
+        self.next_widget = NextPieceWidget()
+        left_panel.addWidget(self.next_widget)
+        
+        left_panel.addStretch()
+        
+        # Game over overlay
+        self.game_over_label = GlowLabel(self.status_text, 36, '#ff0000')
+        self.game_over_label.setAlignment(Qt.AlignCenter)
+        self.game_over_label.hide()
+        
+        self.restart_btn = QPushButton("RESTART")
+        self.restart_btn.setStyleSheet('''
+            QPushButton {
+                background-color: #ff00ff;
+                color: white;
+                font-size: 18px;
+                font-weight: bold;
+                padding: 10px 30px;
+                border-radius: 8px;
+                border: 2px solid #00ffff;
+            }
+            QPushButton:hover {
+                background-color: #00ffff;
+                color: black;
+            }
+        ''')
+        self.restart_btn.clicked.connect(self.restart)
+        self.restart_btn.hide()
+        
+        self.center_layout.addWidget(self.game_over_label)
+        self.center_layout.addWidget(self.restart_btn, alignment=Qt.AlignCenter)
+        
+        # Right panel
+        right_panel = self.right_panel
+        right_panel.addWidget(GlowLabel("ARCADE MODE", 16, '#ff00ff'))
+        right_panel.addWidget(GlowLabel("HARDCORE", 14, '#ff0000'))
+        
+        right_panel.addSpacing(20)
+        right_panel.addWidget(GlowLabel("SPEED METER", 14, '#00ffff'))
+        self.speed_meter = SpeedMeter()
+        right_panel.addWidget(self.speed_meter, alignment=Qt.AlignCenter)
+        
+        right_panel.addSpacing(20)
+        self.fever_label = GlowLabel("FEVER MODE!", 18, '#ffff00')
+        self.fever_label.setAlignment(Qt.AlignCenter)
+        self.fever_label.hide()
+        right_panel.addWidget(self.fever_label)
+        
+        right_panel.addSpacing(10)
+        self.leaderboard_panel = LeaderboardPanel()
+        right_panel.addWidget(self.leaderboard_panel)
+        
+        right_panel.addStretch()
+        
+        if self.link:
+            opponent_panel = self.opponent_panel
+            opponent_panel.addWidget(GlowLabel("OPPONENT", 14, '#ff0000'))
+            self.opponent_name_label = GlowLabel("", 14, '#ffffff', chars=12)
+            opponent_panel.addWidget(self.opponent_name_label)
+            self.opponent_board = OpponentBoard()
+            opponent_panel.addWidget(self.opponent_board)
+            self.opponent_score_label = GlowLabel("", 12, '#ffff00', chars=14)
+            opponent_panel.addWidget(self.opponent_score_label)
+            self.incoming_label = GlowLabel("", 12, '#ff0000', chars=14)
+            opponent_panel.addWidget(self.incoming_label)
+            opponent_panel.addStretch()
+        
+        # Footer
+        footer = QLabel("© 2025 MACAN ANGKASA")
+        footer.setStyleSheet('''
+            QLabel {
+                color: #666;
+                font-size: 10px;
+                font-family: "Courier New", monospace;
+            }
+        ''')
+        footer.setAlignment(Qt.AlignCenter)
+        self.main_layout.addWidget(footer)
+        
+        # Catch the new widgets up with the game started before they existed
+        self.panels_ready = True
+        self.update_ui()
+        self.refresh_next_piece()
+        self.set_speed_level(self.speed_level)
+        self.fever_label.setVisible(self.fever_mode_active)
+        if self.leaderboard_snapshot:
+            self.leaderboard_panel.show_snapshot(self.leaderboard_snapshot)
+        if self.link:
+            self.refresh_opponent(True)
+        self.game_over_label.setVisible(not self.game_active)
+        self.restart_btn.setVisible(not self.game_active)
+        self.mark_startup('panels')
+
+    def new_game(self, seed=None):
+        self.engine.new_game(seed)
+        self.recorder = ReplayRecorder(self.engine)
+        if self.link:
+            # Garbage can't be replayed from the actions alone
+            self.recorder.complete = False
+            self.incoming_garbage = 0
+        if self.telemetry:
+            self.telemetry.new_game()
+        self.clear_placements.clear()
+        self.game_active = True
+        self.fever_mode_active = False
+        self.max_combo = 0
+        self.game_started = perf_counter()
+        self.reset_animations()
+        
+        if self.panels_ready:
+            self.game_over_label.hide()
+            self.restart_btn.hide()
+        self.set_speed_level(1)
+        
+        self.spawn_piece()
+        self.update_ui()
+        self.board_widget.refresh_all()
+        
+        self.loop.start(perf_counter() * 1000, self.engine.speed)
+        self.frame_timer.start(self.frame_interval)
+        self.profiler.reset_frame()
+        
+        self.play_move_sound()
+
+    def resume_game(self, save):
+        # The engine already holds the saved game; restart the timers mid-phase
+        self.recorder = ReplayRecorder(self.engine)
+        self.recorder.complete = False
+        if self.telemetry:
+            self.telemetry.new_game()
+        self.clear_placements.clear()
+        self.game_active = True
+        self.fever_mode_active = False
+        self.max_combo = self.engine.combo
+        self.game_started = perf_counter()
+        if self.panels_ready:
+            self.game_over_label.hide()
+            self.restart_btn.hide()
+        self.reset_animations()
+        
+        self.refresh_next_piece()
+        
+        level, speed = 1, 1000
+        while speed > self.engine.speed:
+            speed = max(100, int(speed * 0.85))
+            level += 1
+        self.set_speed_level(level)
+        
+        if save.fever:
+            self.activate_fever_mode(min(save.fever_phase, FEVER_MS - 1))
+        
+        self.update_ui()
+        self.board_widget.refresh_all()
+        self.loop.start(perf_counter() * 1000, self.engine.speed, save.gravity_phase, save.speed_phase)
+        if self.engine.pending_clears:
+            self.start_clear()
+        self.frame_timer.start(self.frame_interval)
+        self.profiler.reset_frame()
+
+    def spawn_piece(self):
+        spawned = self.engine.spawn_piece()
+        self.refresh_next_piece()
+        
+        if not spawned:
+            self.game_over()
+
+    def refresh_next_piece(self):
+        self.next_piece_type = self.engine.next_piece
+        if self.panels_ready and self.next_piece_type:
+            self.next_widget.next_piece = self.next_piece_type
+            self.next_widget.next_shape = SHAPES[self.next_piece_type]
+            self.next_widget.update()
+
+    def set_speed_level(self, level):
+        self.speed_level = min(20, level)
+        if self.panels_ready:
+            self.speed_meter.speed_level = self.speed_level
+            self.speed_meter.update()
+
+    def advance_frame(self):
+        # Runs every simulation step that has come due since the last frame
+        self.profiler.mark_frame(self.frame_interval)
+        now = perf_counter() * 1000
+        self.loop.advance(now)
+        self.advance_animations(now)
+        if self.bot_active:
+            self.bot_step(now)
+
+    def advance_animations(self, now):
+        animations = self.animations
+        animations.advance(now)
+        board = self.board_widget
+        board.set_flash_opacity(animations.value('flash'))
+        board.set_fever_level(animations.value('fever_glow'))
+        board.refresh_particles()
+
+    def reset_animations(self):
+        self.animations.reset(perf_counter() * 1000)
+        self.board_widget.clearing_lines = []
+        self.board_widget.set_flash_opacity(0.0)
+        self.board_widget.set_fever_level(0.0)
+        self.board_widget.refresh_particles()
+
+    def bot_step(self, now):
+        # Delay 0 places a whole piece per frame
+        while self.game_active and not self.loop.frozen and now >= self.bot_next:
+            action = self.bot.next_input(self.engine)
+            if action is None:
+                return
+            if action == MOVE_LEFT:
+                self.move_left()
+            elif action == MOVE_RIGHT:
+                self.move_right()
+            elif action == ROTATE:
+                self.rotate()
+            else:
+                self.fast_drop()
+            if self.bot_delay:
+                self.bot_next = now + self.bot_delay
+            elif action == HARD_DROP:
+                return
+
+    def repeat_input(self, action):
+        if action == MOVE_LEFT:
+            return self.move_left()
+        if action == MOVE_RIGHT:
+            return self.move_right()
+        return self.move_down()
+
+    def game_tick(self):
+        if not self.game_active:
+            return
+        started = perf_counter()
+        self.move_down(GRAVITY)
+        self.profiler.record('game_tick', started)
+
+    def move_down(self, action=SOFT_DROP):
+        if not self.game_active or self.loop.frozen:
+            return False
+        self.recorder.record(action)
+        moved = self.engine.move(1, 0)
+        if not moved:
+            self.lock_piece()
+            self.clear_lines()
+            # Rows being cleared hold the next piece back until complete_clear()
+            if not self.engine.pending_clears:
+                self.spawn_piece()
+        self.board_widget.refresh_piece()
+        return moved
+
+    def move_left(self):
+        if not self.game_active or self.loop.frozen:
+            return False
+        self.recorder.record(MOVE_LEFT)
+        if self.engine.move(0, -1):
+            self.play_move_sound()
+            self.board_widget.refresh_piece()
+            return True
+        return False
+
+    def move_right(self):
+        if not self.game_active or self.loop.frozen:
+            return False
+        self.recorder.record(MOVE_RIGHT)
+        if self.engine.move(0, 1):
+            self.play_move_sound()
+            self.board_widget.refresh_piece()
+            return True
+        return False
+
+    def rotate(self):
+        if not self.game_active or self.loop.frozen:
+            return False
+        self.recorder.record(ROTATE)
+        if self.engine.rotate():
+            self.play_move_sound()
+            self.board_widget.refresh_piece()
+            return True
+        return False
+
+    def fast_drop(self):
+        if not self.game_active or self.loop.frozen:
+            return False
+        self.recorder.record(HARD_DROP)
+        self.engine.hard_drop()
+        self.log_lock()
+        self.clear_lines()
+        if not self.engine.pending_clears:
+            self.spawn_piece()
+        self.board_widget.refresh_piece()
+        self.play_move_sound()
+
+    def check_collision(self):
+        return self.engine.check_collision()
+
+    def lock_piece(self):
+        self.engine.lock_piece()
+        self.log_lock()
+
+    def clear_lines(self):
+        started = perf_counter()
+        lines = self.engine.clear_lines()
+        if not lines:
+            if self.incoming_garbage:
+                self.take_garbage()
+            self.update_ui()
+            self.profiler.record('clear_lines', started)
+            return
+        
+        if self.telemetry:
+            self.clear_placements.append(self.lock_placement)
+        self.start_clear()
+        self.profiler.record('clear_lines', started)
+
+    def start_clear(self):
+        # Freezes the game while the oldest pending rows flash and burst;
+        # complete_clear() removes them, spawns the next piece and thaws it
+        lines = self.engine.pending_clears[0]
+        self.loop.frozen = True
+        self.board_widget.clearing_lines = lines
+        self.animations.start('flash', CLEAR_MS, 1.0, 0.0, ease_out_cubic, self.complete_clear)
+        self.board_widget.set_flash_opacity(1.0)
+        
+        # About 30 sparks per row whatever the board width
+        particles = self.animations.particles
+        cells = self.engine.cells
+        step = max(1, self.engine.width // 10)
+        for y in lines:
+            for x in range(0, self.engine.width, step):
+                particles.emit(x + step / 2, y + 0.5, 3, cells[y][x], 12.0 * step, 0.5)
+        self.board_widget.refresh_particles()
+
+    def complete_clear(self):
+        if not self.engine.pending_clears:
+            return
+        started = perf_counter()
+        self.recorder.record(CLEAR)
+        score = self.engine.score
+        lines = self.engine.complete_clear()
+        self.log_clear(self.engine.score - score, lines)
+        if self.link:
+            self.send_garbage(len(lines))
+        self.board_widget.clearing_lines = []
+        self.board_widget.refresh_rows()
+        self.max_combo = max(self.max_combo, self.engine.combo)
+        if self.engine.pending_clears:
+            self.start_clear()
+        else:
+            self.loop.frozen = False
+        
+        if len(lines) == 4:
+            self.activate_fever_mode()
+        
+        self.play_line_clear_sound()
+        if self.engine.spawn_due():
+            self.spawn_piece()
+            self.board_widget.refresh_piece()
+        self.update_ui()
+        self.save_state()
+        self.profiler.record('complete_clear', started)
+
+    def activate_fever_mode(self, elapsed=0):
+        # `elapsed` resumes a fever that was already that many ms in
+        animations = self.animations
+        self.fever_mode_active = True
+        if not elapsed:
+            self.log_event(telemetry.FEVER)
+        animations.start('fever', FEVER_MS, on_done=self.deactivate_fever, elapsed=elapsed)
+        animations.start('fever_glow', FEVER_FADE_MS, animations.value('fever_glow'), 1.0)
+        if self.panels_ready:
+            self.fever_label.show()
+        
+        engine = self.engine
+        for i in range(48):
+            animations.particles.emit(engine.width / 2, engine.height / 2, 1,
+                                      SPARK_YELLOW if i % 2 else SPARK_WHITE, 25.0, 0.9)
+        self.board_widget.refresh_particles()
+        self.play_arcade_fever_sound()
+
+    def deactivate_fever(self):
+        animations = self.animations
+        self.fever_mode_active = False
+        animations.stop('fever')
+        animations.start('fever_glow', FEVER_FADE_MS, animations.value('fever_glow'), 0.0)
+        if self.panels_ready:
+            self.fever_label.hide()
+
+    def increase_speed(self):
+        self.recorder.record(SPEED_UP)
+        if self.engine.increase_speed():
+            self.log_event(telemetry.SPEED_UP)
+            self.loop.gravity_interval = self.engine.speed
+            self.set_speed_level(self.speed_level + 1)
+
+    def game_over(self, won=False):
+        # `won`: the versus opponent topped out first
+        self.game_active = False
+        self.loop.stop()
+        self.frame_timer.stop()
+        # The frame clock stops here, so rows still flashing are scored now
+        while self.engine.pending_clears:
+            self.recorder.record(CLEAR)
+            score = self.engine.score
+            lines = self.engine.complete_clear()
+            self.log_clear(self.engine.score - score, lines)
+            self.max_combo = max(self.max_combo, self.engine.combo)
+        self.fever_mode_active = False
+        if self.panels_ready:
+            self.fever_label.hide()
+        self.reset_animations()
+        self.board_widget.refresh_all()
+        self.update_ui()
+        
+        if self.engine.score > self.high_score:
+            self.high_score = self.engine.score
+        
+        if self.link:
+            if not won:
+                self.link.send(versus.message(versus.TOPPED_OUT))
+            self.show_status("YOU WIN" if won else "YOU LOSE")
+        if self.panels_ready:
+            self.high_score_label.setText(str(self.high_score))
+            self.game_over_label.show()
+            self.restart_btn.show()
+        self.save_state(urgent=True)
+        self.save_replay()
+        self.record_game()
+        self.log_event(telemetry.GAME_OVER)
+        if self.telemetry:
+            self.telemetry.flush()
+        self.dump_profile()
+        if self.bot_active:
+            QTimer.singleShot(2000, self.restart_bot_game)
+
+    def record_game(self):
+        # Attract-mode and versus games stay off the leaderboard
+        if self.bot_active or self.link:
+            return
+        engine = self.engine
+        self.leaderboard.record(GameRecord(
+            self.player, engine.score, f'{engine.width}x{engine.height}', seed=engine.seed,
+            lines=engine.lines_cleared, level=engine.level, max_combo=self.max_combo,
+            duration_ms=int((perf_counter() - self.game_started) * 1000)))
+
+    def log_event(self, event, score_delta=0, lines=0):
+        if self.telemetry:
+            self.telemetry.log(event, self.engine, score_delta, lines)
+
+    def log_lock(self):
+        if self.telemetry:
+            engine = self.engine
+            self.lock_placement = (engine.orientation, engine.current_pos[0], engine.current_pos[1])
+            self.telemetry.log(telemetry.LOCK, engine)
+
+    def log_clear(self, score_delta, lines):
+        # Stamped with the placement that completed the rows; a game resumed
+        # with rows pending has none, and gets the current piece
+        if self.telemetry:
+            placement = self.clear_placements.popleft() if self.clear_placements else None
+            self.telemetry.log(telemetry.CLEAR, self.engine, score_delta, len(lines), placement)
+
+    def show_leaderboard(self, snapshot):
+        self.leaderboard_snapshot = snapshot
+        if self.panels_ready:
+            self.leaderboard_panel.show_snapshot(snapshot)
+
+    def restart_bot_game(self):
+        if self.bot_active and not self.game_active:
+            self.restart()
+
+    def toggle_bot(self):
+        self.bot_active = not self.bot_active
+        self.bot_next = 0.0
+        self.repeater.reset()
+        if self.bot_active and not self.game_active:
+            self.restart()
+
+    def restart(self):
+        # A versus round starts once the opponent is ready too
+        if not self.link:
+            self.new_game()
+            return
+        if not self.link_open:
+            return
+        self.link.send(versus.message(versus.READY))
+        self.show_status("WAITING")
+
+    def show_status(self, text):
+        # The game-over overlay doubles as the versus round status
+        self.status_text = text
+        if self.panels_ready:
+            self.game_over_label.setText(text)
+
+    def versus_step(self):
+        # Handles what the opponent sent since the last frame, then sends our
+        # board if it changed. Runs on the GUI thread; the link only hands
+        # over queued payloads, so it never waits on the network. Malformed
+        # updates are dropped; an unplayable HELLO ends the link.
+        board_changed = False
+        payloads = self.link.poll()
+        for payload in payloads:
+            kind = payload[0] if payload else None
+            if kind == versus.BOARD:
+                if self.opponent:
+                    try:
+                        self.opponent.apply(payload)
+                    except versus.VersusError as e:
+                        print(f"Versus error: {e}")
+                        continue
+                    board_changed = True
+            elif kind == versus.GARBAGE:
+                if len(payload) == versus.GARBAGE_MSG.size:
+                    self.incoming_garbage += payload[1]
+            elif kind == versus.START:
+                if len(payload) == versus.START_MSG.size:
+                    seed = versus.START_MSG.unpack(payload)[1]
+                    self.garbage_rng.seed(seed)
+                    self.new_game(seed)
+            elif kind == versus.TOPPED_OUT:
+                if self.game_active:
+                    self.game_over(won=True)
+            elif kind == versus.HELLO:
+                try:
+                    self.opponent = versus.OpponentState.from_hello(payload)
+                except versus.VersusError as e:
+                    print(f"Versus error: {e}")
+                    self.link.close()
+                    self.link_open = False
+                    if self.game_active:
+                        self.game_over(won=True)
+                    self.show_status("OPPONENT REFUSED")
+                    break
+                # Their view starts empty, so send the whole board next
+                self.board_sync.reset()
+                board_changed = True
+            elif kind == versus.BYE:
+                self.link_open = False
+                if self.game_active:
+                    self.game_over(won=True)
+                self.show_status("OPPONENT LEFT")
+        if payloads:
+            self.refresh_opponent(board_changed)
+        delta = self.board_sync.delta(self.engine)
+        if delta:
+            self.link.send(delta)
+
+    def refresh_opponent(self, board_changed=False):
+        if not self.panels_ready:
+            return
+        opponent = self.opponent
+        if board_changed:
+            self.opponent_board.opponent = opponent
+            self.opponent_board.update()
+        if opponent:
+            self.opponent_name_label.setText(opponent.name[:12])
+            self.opponent_score_label.setText(f"{opponent.score} / {opponent.lines}L")
+        self.incoming_label.setText(f"INCOMING {self.incoming_garbage}" if self.incoming_garbage
+                                    else "")
+
+    def take_garbage(self):
+        # Incoming rows land after a placement that clears nothing; if they
+        # push the stack out the top, the next spawn ends the game
+        count, self.incoming_garbage = self.incoming_garbage, 0
+        self.engine.add_garbage(count, self.garbage_rng.randrange(self.engine.width))
+        self.board_widget.refresh_all()
+        self.refresh_opponent()
+
+    def send_garbage(self, cleared):
+        # Cleared lines cancel incoming rows first; the rest go to the opponent
+        count = versus.GARBAGE_LINES[min(cleared, 4)]
+        cancelled = min(count, self.incoming_garbage)
+        self.incoming_garbage -= cancelled
+        if count > cancelled:
+            self.link.send(versus.garbage(count - cancelled))
+        if cancelled:
+            self.refresh_opponent()
+
+    def update_ui(self):
+        # Runs after every placement; labels only repaint values that changed
+        if not self.panels_ready:
+            return
+        engine = self.engine
+        values = (engine.score, engine.level, self.high_score, engine.combo)
+        if values == self._hud_values:
+            return
+        self._hud_values = values
+        self.score_label.setText(str(engine.score))
+        self.level_label.setText(str(engine.level))
+        self.high_score_label.setText(str(self.high_score))
+        self.combo_label.setText(f"x{engine.combo}")
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key_F3:
+            self.toggle_profiler()
+            return
+        if event.key() == Qt.Key_F2:
+            self.toggle_bot()
+            return
+        if not self.game_active or self.bot_active or event.isAutoRepeat():
+            return
+        
+        self.profiler.mark_input()
+        if event.key() == Qt.Key_Left:
+            self.move_left()
+        elif event.key() == Qt.Key_Right:
+            self.move_right()
+        elif event.key() == Qt.Key_Down:
+            self.move_down()
+        elif event.key() == Qt.Key_Up:
+            self.rotate()
+        elif event.key() == Qt.Key_Space:
+            self.fast_drop()
+        if event.key() in REPEAT_KEYS:
+            self.repeater.press(REPEAT_KEYS[event.key()])
+
+    def keyReleaseEvent(self, event):
+        if not event.isAutoRepeat() and event.key() in REPEAT_KEYS:
+            self.repeater.release(REPEAT_KEYS[event.key()])
+
+    def toggle_profiler(self):
+        if self.profiler.toggle():
+            self.hud_timer.start(250)
+        else:
+            self.hud_timer.stop()
+        self.board_widget.refresh_all()
+
+    def refresh_profiler_hud(self):
+        self.board_widget.refresh_hud()
+
+    def dump_profile(self):
+        if not self.profiler.enabled:
+            return
+        summary = json.dumps(self.profiler.summary(), indent=2).encode()
+        self.writer.save(self.save_path.with_name('profile.json'), lambda: summary, urgent=True)
+
+    def save_replay(self):
+        if not self.recorder.complete:
+            return  # Resumed games don't have their opening moves
+        replay_dir = self.save_path.with_name('replays')
+        data = self.recorder.to_bytes(self.engine)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.engine.seed:08x}.mtr"
+        
+        def write():
+            replay_dir.mkdir(exist_ok=True)
+            atomic_write(replay_dir / name, data)
+            for old in sorted(replay_dir.glob('*.mtr'))[:-MAX_REPLAYS]:
+                old.unlink()
+        self.writer.run('replays', write, urgent=True)
+
+    def get_save_path(self):
+        directory = save_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        if self.large_board:
+            return directory / f'state-{self.engine.width}x{self.engine.height}.sav'
+        return directory / 'state.sav'
+
+    def save_state(self, urgent=False):
+        if self.link:
+            return
+        started = perf_counter()
+        save = SaveGame(self.high_score, self.engine, self.game_active)
+        if self.game_active:
+            save.gravity_phase = self.loop.gravity_phase
+            save.speed_phase = self.loop.speed_phase
+        if self.fever_mode_active:
+            save.fever = True
+            save.fever_phase = int(self.animations.elapsed('fever'))
+        data = encode_save(save)
+        self.writer.save(self.save_path, lambda: data, urgent)
+        self.profiler.record('save_state', started)
+
+    def load_state(self):
+        # Returns the SaveGame, restoring any unfinished game into the engine
+        save = None
+        try:
+            if self.save_path.exists():
+                save = decode_save(self.save_path.read_bytes(), self.engine)
+            else:
+                legacy = self.save_path.with_name('state.json')
+                if legacy.exists():
+                    save = migrate_json(legacy.read_text())
+        except (OSError, SaveError) as e:
+            print(f"Load error: {e}")
+        if save:
+            self.high_score = save.high_score
+            self.update_ui()
+        return save
+
+    def closeEvent(self, event):
+        # Keep an unfinished game for the next launch, then drain pending saves
+        if self.game_active:
+            self.save_state(urgent=True)
+        self.frame_timer.stop()
+        self.writer.close()
+        self.leaderboard.close(2)
+        if self.telemetry:
+            self.telemetry.close(2)
+        if self.link:
+            self.versus_timer.stop()
+            self.link.close()
+        if self.audio:
+            self.audio.close()
+        super().closeEvent(event)
+
+    # Sound effects (silent until build_panels() has set up the audio engine)
+    def play_line_clear_sound(self):
+        if self.audio:
+            self.audio.play('line_clear')
+
+    def play_move_sound(self):
+        if self.audio:
+            self.audio.play('move')
+
+    def play_arcade_fever_sound(self):
+        if self.audio:
+            self.audio.play('fever')
+
+    def mark_startup(self, name):
+        if self.startup_clock and name not in self.timings:
+            self.timings[name] = self.startup_clock()
+            return self.timings[name]
+
+
+def run(launched, launch_age=0.0, deferred_ui=True, measure_startup=False, width=BOARD_WIDTH,
+        height=BOARD_HEIGHT, player=None, link=None, bot_link=None):
+    # `launched` is the launcher's perf_counter() at its first line and
+    # `launch_age` the process age then, so timings count from process start
+    def clock():
+        return launch_age + (perf_counter() - launched) * 1000
+    imported = clock()
+    app = QApplication(sys.argv[:1])
+    window = MacanTetrisNeo(deferred_ui, clock, width, height, player, link)
+    window.timings.update(launch=launch_age, imports=imported)
+    window.mark_startup('window')
+    
+    build_panels = window.board_widget.on_first_frame
+    def on_first_frame():
+        window.profiler.add('startup', window.mark_startup('first_frame'))
+        if build_panels:
+            build_panels()
+        if measure_startup:
+            timings = sorted(window.timings.items(), key=lambda item: item[1])
+            print(json.dumps({key: round(value, 1) for key, value in timings}))
+            window.close()
+    window.board_widget.on_first_frame = on_first_frame
+    if window.large_board:
+        window.showMaximized()
+    else:
+        window.show()
+    if bot_link:
+        # Local versus: the autoplayer takes the other end in its own window
+        rival = MacanTetrisNeo(False, None, width, height, 'BOT', bot_link)
+        rival.bot_active = True
+        rival.show()
+    return app.exec()
\ No newline at end of file
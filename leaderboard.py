@@ -0,0 +1,261 @@
+import sys
+import json
+import time
+import queue
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+
+from storage import save_dir
+
+DEFAULT_PLAYER = 'PLAYER'
+DEFAULT_BOARD = '10x20'
+TOP_N = 5
+
+# user_version 1: players and games tables
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    player_id INTEGER NOT NULL REFERENCES players(id),
+    board TEXT NOT NULL,
+    played_at REAL NOT NULL,
+    day TEXT NOT NULL,
+    seed INTEGER,
+    score INTEGER NOT NULL,
+    lines INTEGER,
+    level INTEGER,
+    max_combo INTEGER,
+    duration_ms INTEGER,
+    source TEXT NOT NULL DEFAULT 'game'
+);
+CREATE INDEX IF NOT EXISTS games_board_score ON games(board, score DESC);
+CREATE INDEX IF NOT EXISTS games_player_score ON games(player_id, board, score DESC);
+CREATE INDEX IF NOT EXISTS games_day_score ON games(board, day, score DESC);
+'''
+
+
+class GameRecord:
+    # One finished game; `day` is derived from played_at in local time
+    __slots__ = ('player', 'board', 'played_at', 'seed', 'score', 'lines', 'level',
+                 'max_combo', 'duration_ms')
+
+    def __init__(self, player, score, board=DEFAULT_BOARD, played_at=None, seed=None, lines=None,
+                 level=None, max_combo=None, duration_ms=None):
+        self.player = player
+        self.board = board
+        self.played_at = time.time() if played_at is None else played_at
+        self.seed = seed
+        self.score = score
+        self.lines = lines
+        self.level = level
+        self.max_combo = max_combo
+        self.duration_ms = duration_ms
+
+
+def leaderboard_path():
+    return save_dir() / 'leaderboard.db'
+
+
+def connect(path, legacy=()):
+    # Opens (creating if needed) the database in WAL mode, so the writer thread
+    # and readers never block each other. A new database imports the
+    # `legacy` state.json files once.
+    conn = sqlite3.connect(str(path), timeout=5)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA foreign_keys=ON')
+    if conn.execute('PRAGMA user_version').fetchone()[0] == 0:
+        with conn:
+            conn.executescript(SCHEMA)
+            import_json(conn, legacy)
+            conn.execute('PRAGMA user_version = 1')
+    return conn
+
+
+def player_id(conn, name):
+    conn.execute('INSERT OR IGNORE INTO players(name) VALUES (?)', (name,))
+    return conn.execute('SELECT id FROM players WHERE name = ?', (name,)).fetchone()[0]
+
+
+def insert_game(conn, record, source='game'):
+    day = time.strftime('%Y-%m-%d', time.localtime(record.played_at))
+    conn.execute(
+        'INSERT INTO games(player_id, board, played_at, day, seed, score, lines, level, '
+        'max_combo, duration_ms, source) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        (player_id(conn, record.player), record.board, record.played_at, day, record.seed,
+         record.score, record.lines, record.level, record.max_combo, record.duration_ms, source))
+
+
+def import_json(conn, paths, player=DEFAULT_PLAYER):
+    # Old state.json saves only held a high score; each becomes one game dated
+    # by the file's modification time. Returns the number imported.
+    count = 0
+    for path in paths:
+        path = Path(path)
+        try:
+            state = json.loads(path.read_text())
+            score = int(state.get('high_score', 0))
+            played_at = path.stat().st_mtime
+        except FileNotFoundError:
+            continue
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            print(f"Import error: {path}: {e}")
+            continue
+        if score > 0:
+            insert_game(conn, GameRecord(player, score, played_at=played_at), 'import')
+            count += 1
+    return count
+
+
+def top_scores(conn, n=TOP_N, board=DEFAULT_BOARD, player=None, day=None):
+    # [(player, score, lines, played_at)], best first
+    query = ('SELECT p.name, g.score, g.lines, g.played_at FROM games g '
+             'JOIN players p ON p.id = g.player_id WHERE g.board = ?')
+    args = [board]
+    if player is not None:
+        query += ' AND g.player_id = (SELECT id FROM players WHERE name = ?)'
+        args.append(player)
+    if day is not None:
+        query += ' AND g.day = ?'
+        args.append(day)
+    query += ' ORDER BY g.score DESC LIMIT ?'
+    args.append(n)
+    return conn.execute(query, args).fetchall()
+
+
+def daily_bests(conn, days=7, board=DEFAULT_BOARD):
+    # [(day, player, score)] for the most recent `days` days with games
+    return conn.execute(
+        'SELECT g.day, p.name, MAX(g.score) FROM games g JOIN players p ON p.id = g.player_id '
+        'WHERE g.board = ? GROUP BY g.day ORDER BY g.day DESC LIMIT ?', (board, days)).fetchall()
+
+
+def player_stats(conn, player, board=DEFAULT_BOARD):
+    # (games, best, mean score, total lines, best combo, total minutes), or None
+    row = conn.execute(
+        'SELECT COUNT(*), MAX(score), AVG(score), TOTAL(lines), MAX(max_combo), '
+        'TOTAL(duration_ms) / 60000.0 FROM games '
+        'WHERE player_id = (SELECT id FROM players WHERE name = ?) AND board = ?',
+        (player, board)).fetchone()
+    return row if row[0] else None
+
+
+class Leaderboard:
+    # Owns the database on a background thread. record() and refresh() only
+    # queue work, so the caller never waits on SQLite; after each batch the
+    # thread calls on_update(snapshot) with the current top scores.
+    def __init__(self, path=None, player=DEFAULT_PLAYER, board=DEFAULT_BOARD, on_update=None,
+                 legacy=(), top=TOP_N):
+        self.path = path or leaderboard_path()
+        self.player = player
+        self.board = board
+        self.on_update = on_update
+        self.legacy = legacy
+        self.top = top
+        self._jobs = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name='Leaderboard', daemon=True)
+        self._thread.start()
+        self.refresh()
+
+    def record(self, record):
+        self._jobs.put(record)
+
+    def refresh(self):
+        self._jobs.put('refresh')
+
+    def close(self, timeout=None):
+        # Finishes queued inserts, then stops the thread
+        self._jobs.put(None)
+        self._thread.join(timeout)
+
+    def snapshot(self, conn):
+        today = time.strftime('%Y-%m-%d')
+        best = top_scores(conn, 1, self.board, self.player)
+        return {
+            'top': top_scores(conn, self.top, self.board),
+            'today': top_scores(conn, 1, self.board, day=today),
+            'player_best': best[0][1] if best else 0,
+        }
+
+    def _run(self):
+        try:
+            conn = connect(self.path, self.legacy)
+        except sqlite3.Error as e:
+            print(f"Leaderboard error: {e}")
+            # Keep draining so callers never notice
+            while self._jobs.get() is not None:
+                pass
+            return
+        closing = False
+        while not closing:
+            jobs = [self._jobs.get()]
+            # Everything already queued goes in the same transaction
+            while True:
+                try:
+                    jobs.append(self._jobs.get_nowait())
+                except queue.Empty:
+                    break
+            closing = None in jobs
+            try:
+                with conn:
+                    for job in jobs:
+                        if isinstance(job, GameRecord):
+                            insert_game(conn, job)
+                if self.on_update and not closing:
+                    self.on_update(self.snapshot(conn))
+            except sqlite3.Error as e:
+                print(f"Leaderboard error: {e}")
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show leaderboards and player history")
+    parser.add_argument('-n', '--top', type=int, default=10)
+    parser.add_argument('--board', default=DEFAULT_BOARD, help="WxH (default 10x20)")
+    parser.add_argument('--player', help="that player's best games and totals")
+    parser.add_argument('--daily', type=int, metavar='DAYS', help="best game of each recent day")
+    parser.add_argument('--import', dest='imports', nargs='+', metavar='FILE',
+                        help="import high scores from state.json files")
+    parser.add_argument('--db', type=Path, default=None,
+                        help="default: leaderboard.db in the save directory")
+    args = parser.parse_args(argv)
+
+    path = args.db or leaderboard_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        conn = connect(path, [path.with_name('state.json')])
+        if args.imports:
+            with conn:
+                count = import_json(conn, args.imports, args.player or DEFAULT_PLAYER)
+            print(f"Imported {count} of {len(args.imports)} files")
+        if args.daily:
+            for day, name, score in daily_bests(conn, args.daily, args.board):
+                print(f"{day}  {name:<16}{score:>10}")
+            return 0
+        if args.player:
+            stats = player_stats(conn, args.player, args.board)
+            if not stats:
+                print(f"No {args.board} games for {args.player}")
+                return 1
+            games, best, mean, lines, combo, minutes = stats
+            print(f"{args.player}: {games} games, best {best}, mean {mean:.0f}, "
+                  f"{lines:.0f} lines, best combo x{combo or 0}, {minutes:.1f} minutes")
+        rows = top_scores(conn, args.top, args.board, args.player)
+        for rank, (name, score, lines, played_at) in enumerate(rows, 1):
+            when = time.strftime('%Y-%m-%d %H:%M', time.localtime(played_at))
+            lines = '' if lines is None else f"{lines} lines"
+            print(f"{rank:>3}. {name:<16}{score:>10}  {lines:<10}  {when}")
+        conn.close()
+    except sqlite3.Error as e:
+        print(f"Leaderboard error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import sys
+import queue
+import random
+import struct
+import asyncio
+import argparse
+import threading
+
+from versus import BYE, Match, VersusError, check_hello, drain, message
+
+PORT = 7777
+CONNECT_TIMEOUT = 5.0
+# Each payload goes on the wire as its little-endian u16 length, then the bytes
+FRAME = struct.Struct('<H')
+
+
+async def read_frame(reader):
+    # The next payload, or None once the connection has closed
+    try:
+        size, = FRAME.unpack(await reader.readexactly(FRAME.size))
+        return await reader.readexactly(size)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+
+
+def frame(payload):
+    return FRAME.pack(len(payload)) + payload
+
+
+class VersusLink:
+    # Client connection on its own asyncio event-loop thread. send() hands the
+    # payload to that loop and returns; received payloads wait in a queue for
+    # poll(), so the Qt thread never blocks on the network.
+    def __init__(self, host, port=PORT, timeout=CONNECT_TIMEOUT):
+        self.incoming = queue.SimpleQueue()
+        self._writer = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='Versus', daemon=True)
+        self._thread.start()
+        future = asyncio.run_coroutine_threadsafe(self._connect(host, port), self._loop)
+        try:
+            future.result(timeout)
+        except BaseException:
+            future.cancel()
+            self.close()
+            raise
+
+    async def _connect(self, host, port):
+        reader, self._writer = await asyncio.open_connection(host, port)
+        # The loop only holds tasks weakly
+        self._reader_task = self._loop.create_task(self._read(reader))
+
+    async def _read(self, reader):
+        while True:
+            payload = await read_frame(reader)
+            if payload is None:
+                break
+            self.incoming.put(payload)
+        self.incoming.put(message(BYE))
+
+    def _write(self, data):
+        if self._writer and not self._writer.is_closing():
+            self._writer.write(data)
+
+    def send(self, payload):
+        if not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._write, frame(payload))
+
+    def poll(self):
+        return drain(self.incoming)
+
+    def close(self, timeout=1.0):
+        if self._loop.is_closed():
+            return
+        if self._writer:
+            self._loop.call_soon_threadsafe(self._writer.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self._loop.close()
+
+
+class VersusServer:
+    # Pairs clients in the order they connect and relays each pair's messages.
+    # A client's first message must be its HELLO, for a board size the game
+    # supports, which the server holds until it has an opponent. A waiting
+    # client that disconnects gives up its place.
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.waiting = None
+
+    async def handle(self, reader, writer):
+        payload = await read_frame(reader)
+        try:
+            check_hello(payload or b'')
+        except VersusError as e:
+            print(f"Versus error: {e}")
+            writer.close()
+            return
+        waiting = self.waiting
+        if waiting and waiting[1].is_closing():
+            waiting = self.waiting = None
+        early = []
+        read = None
+        if waiting is None:
+            paired = asyncio.get_running_loop().create_future()
+            entry = self.waiting = (payload, writer, paired)
+            # Keep reading while unpaired, to notice a disconnect; anything the
+            # client sends meanwhile (its READY) is relayed once it's paired
+            read = asyncio.ensure_future(read_frame(reader))
+            while not paired.done():
+                await asyncio.wait((read, paired), return_when=asyncio.FIRST_COMPLETED)
+                if not read.done():
+                    break
+                if read.result() is None and not paired.done():
+                    if self.waiting is entry:
+                        self.waiting = None
+                    writer.close()
+                    return
+                early.append(read.result())
+                read = asyncio.ensure_future(read_frame(reader))
+            match, writers, side = paired.result()
+        else:
+            other_hello, other_writer, paired = waiting
+            self.waiting = None
+            match = Match(self.rng.getrandbits(32))
+            writers = [other_writer, writer]
+            side = 1
+            paired.set_result((match, writers, 0))
+            other_writer.write(frame(payload))
+            writer.write(frame(other_hello))
+        while True:
+            if early:
+                payload = early.pop(0)
+            elif read:
+                payload, read = await read, None
+            else:
+                payload = await read_frame(reader)
+            if payload is None:
+                break
+            for to, msg in match.receive(side, payload):
+                if not writers[to].is_closing():
+                    writers[to].write(frame(msg))
+        if not writers[1 - side].is_closing():
+            writers[1 - side].write(frame(message(BYE)))
+        writer.close()
+
+
+async def serve(host, port, seed=None):
+    server = VersusServer(seed)
+    listener = await asyncio.start_server(server.handle, host, port)
+    names = ', '.join(f"{s.getsockname()[0]}:{s.getsockname()[1]}" for s in listener.sockets)
+    print(f"Versus server on {names}")
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a versus server; players join with "
+                                                 "`main.py --versus HOST[:PORT]`")
+    parser.add_argument('--host', default='0.0.0.0', help="address to listen on (default: all)")
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--seed', type=int, help="seed for the rounds' piece sequences")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.seed))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Versus error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
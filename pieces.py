@@ -0,0 +1,74 @@
+from functools import lru_cache
+
+# Tetromino shapes
+SHAPES = {
+    'I': [[1,1,1,1]], 'O': [[1,1],[1,1]], 'T': [[0,1,0],[1,1,1]],
+    'S': [[0,1,1],[1,1,0]], 'Z': [[1,1,0],[0,1,1]],
+    'J': [[1,0,0],[1,1,1]], 'L': [[0,0,1],[1,1,1]]
+}
+# Cell values in the piece grid: 0 is empty, otherwise PIECE_TYPES index + 1
+PIECE_TYPES = list(SHAPES.keys())
+PIECE_INDEX = {p: i + 1 for i, p in enumerate(PIECE_TYPES)}
+# Cell value of the garbage rows sent between versus players
+GARBAGE_INDEX = len(PIECE_TYPES) + 1
+
+BOARD_WIDTH = 10
+BOARD_HEIGHT = 20
+# Board size limits; a piece must fit both ways round
+MIN_BOARD_SIZE = 4
+MAX_BOARD_WIDTH = 200
+MAX_BOARD_HEIGHT = 400
+
+# Offsets (dy, dx) tried in order when a rotation collides in place
+KICKS = ((0, 0), (0, -1), (0, 1))
+I_KICKS = KICKS + ((0, -2), (0, 2))
+
+
+def spawn_column(board_width):
+    # Column 4 on the standard board, and just left of center on any other
+    return board_width // 2 - 1
+
+
+def rotate_shape(shape):
+    # Clockwise, anchored at the top-left corner of the bounding box
+    return [[shape[len(shape)-1-j][i] for j in range(len(shape))]
+            for i in range(len(shape[0]))]
+
+
+class Orientation:
+    __slots__ = ('piece', 'index', 'rotation', 'shape', 'cells', 'width', 'height',
+                 'masks', 'col_masks', 'tops', 'bottoms', 'kicks')
+
+    def __init__(self, piece, rotation, shape, board_width):
+        self.piece = piece
+        self.index = PIECE_INDEX[piece]
+        self.rotation = rotation
+        self.shape = tuple(tuple(row) for row in shape)
+        self.cells = tuple((y, x) for y, row in enumerate(shape)
+                           for x, val in enumerate(row) if val)
+        self.height = len(shape)
+        self.width = len(shape[0])
+        # Highest and lowest filled row of each column of the bounding box
+        self.tops = tuple(min(y for y, x in self.cells if x == col) for col in range(self.width))
+        self.bottoms = tuple(max(y for y, x in self.cells if x == col) for col in range(self.width))
+        self.masks = tuple(sum(1 << x for x, val in enumerate(row) if val) for row in shape)
+        # Row masks pre-shifted for every column the piece fits in
+        self.col_masks = tuple(tuple(m << col for m in self.masks)
+                               for col in range(board_width - self.width + 1))
+        self.kicks = I_KICKS if piece == 'I' else KICKS
+
+
+@lru_cache(maxsize=None)
+def build_piece_table(board_width=BOARD_WIDTH):
+    # piece -> the four clockwise orientations, starting from SHAPES
+    table = {}
+    for piece, shape in SHAPES.items():
+        orientations = []
+        for rotation in range(4):
+            orientations.append(Orientation(piece, rotation, shape, board_width))
+            shape = rotate_shape(shape)
+        table[piece] = tuple(orientations)
+    return table
+
+
+PIECE_TABLE = build_piece_table(BOARD_WIDTH)
@@ -0,0 +1,101 @@
+import os
+from array import array
+from time import perf_counter
+
+PROFILE_ENV = 'MACAN_PROFILE'
+
+
+def process_age():
+    # Milliseconds since this process started, from /proc where available
+    try:
+        with open('/proc/self/stat') as f:
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, (uptime - start_ticks / os.sysconf('SC_CLK_TCK')) * 1000)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0.0
+
+
+class RollingHistogram:
+    # Fixed-size ring of the most recent samples, in milliseconds
+    def __init__(self, size=1024):
+        self.samples = array('d', bytes(8 * size))
+        self.size = size
+        self.count = 0
+
+    def add(self, value):
+        self.samples[self.count % self.size] = value
+        self.count += 1
+
+    def percentiles(self, *points):
+        n = min(self.count, self.size)
+        if not n:
+            return [0.0] * len(points)
+        ordered = sorted(self.samples[:n])
+        return [ordered[min(n - 1, int(p / 100 * n))] for p in points]
+
+    def summary(self):
+        p50, p95, p99, top = self.percentiles(50, 95, 99, 100)
+        return {'count': self.count, 'p50': p50, 'p95': p95, 'p99': p99, 'max': top}
+
+
+class Profiler:
+    # Timing sections, frame timer jitter and input-to-present latency
+    def __init__(self, enabled=None, size=1024):
+        if enabled is None:
+            enabled = os.environ.get(PROFILE_ENV, '') not in ('', '0')
+        self.enabled = enabled
+        self.size = size
+        self.histograms = {}
+        self._input_at = None
+        self._last_frame = None
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self._input_at = None
+        self._last_frame = None
+        return self.enabled
+
+    def add(self, name, value):
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = RollingHistogram(self.size)
+        hist.add(value)
+
+    def record(self, name, started):
+        # `started` is a perf_counter() value taken when the section began
+        if self.enabled:
+            self.add(name, (perf_counter() - started) * 1000)
+
+    def mark_frame(self, interval):
+        # Deviation of the actual frame period from the frame timer's interval;
+        # gravity runs on the fixed-step loop inside those frames
+        if not self.enabled:
+            return
+        now = perf_counter()
+        if self._last_frame is not None:
+            self.add('frame_jitter', (now - self._last_frame) * 1000 - interval)
+        self._last_frame = now
+
+    def reset_frame(self):
+        self._last_frame = None
+
+    def mark_input(self):
+        # Only the first input before a frame counts; later ones wait less
+        if self.enabled and self._input_at is None:
+            self._input_at = perf_counter()
+
+    def mark_present(self):
+        if self._input_at is not None:
+            self.add('input_latency', (perf_counter() - self._input_at) * 1000)
+            self._input_at = None
+
+    def summary(self):
+        return {name: hist.summary() for name, hist in sorted(self.histograms.items())}
+
+    def hud_lines(self):
+        lines = []
+        for name, stats in self.summary().items():
+            lines.append(f"{name:<14}{stats['p50']:7.2f}{stats['p95']:7.2f}{stats['p99']:7.2f}")
+        return lines
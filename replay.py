@@ -0,0 +1,163 @@
+import sys
+import zlib
+import argparse
+from time import perf_counter
+
+from engine import GameEngine, GRAVITY
+from pieces import MIN_BOARD_SIZE, MAX_BOARD_WIDTH, MAX_BOARD_HEIGHT
+
+# File layout: MAGIC, version byte, then varints for seed, width, height and
+# event count, the events, and finally score, lines cleared and board CRC.
+# Each event is one varint: (ticks since previous event << 3) | action.
+MAGIC = b'MTRP'
+VERSION = 2
+
+
+class ReplayError(Exception):
+    pass
+
+
+def write_varint(buf, value):
+    while value > 0x7f:
+        buf.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def read_varint(data, pos):
+    value = shift = 0
+    while True:
+        try:
+            byte = data[pos]
+        except IndexError:
+            raise ReplayError("Truncated replay") from None
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def board_crc(engine):
+    crc = 0
+    for row in engine.cells:
+        crc = zlib.crc32(row, crc)
+    return crc
+
+
+class ReplayRecorder:
+    # Logs every action applied to a game, stamped with the gravity tick index
+    def __init__(self, engine):
+        self.seed = engine.seed
+        self.width = engine.width
+        self.height = engine.height
+        self.events = bytearray()
+        self.count = 0
+        self.tick = 0
+        self._last_tick = 0
+        # False when the game didn't start from its seed (e.g. resumed from a save)
+        self.complete = True
+
+    def record(self, action):
+        write_varint(self.events, (self.tick - self._last_tick) << 3 | action)
+        self._last_tick = self.tick
+        self.count += 1
+        if action == GRAVITY:
+            self.tick += 1
+
+    def to_bytes(self, engine):
+        out = bytearray(MAGIC)
+        out.append(VERSION)
+        for value in (self.seed, self.width, self.height, self.count):
+            write_varint(out, value)
+        out += self.events
+        for value in (engine.score, engine.lines_cleared, board_crc(engine)):
+            write_varint(out, value)
+        return bytes(out)
+
+
+class Replay:
+    def __init__(self, data):
+        if len(data) < 5 or data[:4] != MAGIC:
+            raise ReplayError("Not a replay file")
+        if data[4] != VERSION:
+            raise ReplayError(f"Unsupported replay version {data[4]}")
+        pos = 5
+        self.seed, pos = read_varint(data, pos)
+        self.width, pos = read_varint(data, pos)
+        self.height, pos = read_varint(data, pos)
+        count, pos = read_varint(data, pos)
+        if not (MIN_BOARD_SIZE <= self.width <= MAX_BOARD_WIDTH
+                and MIN_BOARD_SIZE <= self.height <= MAX_BOARD_HEIGHT):
+            raise ReplayError(f"Unplayable board size {self.width}x{self.height}")
+        # Every event takes at least one byte; don't allocate for more than are left
+        if count > len(data) - pos:
+            raise ReplayError("Truncated replay")
+
+        self.actions = bytearray(count)
+        self.ticks = [0] * count
+        tick = 0
+        for i in range(count):
+            value, pos = read_varint(data, pos)
+            tick += value >> 3
+            self.ticks[i] = tick
+            self.actions[i] = value & 7
+
+        self.score, pos = read_varint(data, pos)
+        self.lines_cleared, pos = read_varint(data, pos)
+        self.board_crc, pos = read_varint(data, pos)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    def play(self):
+        # Applies every event back to back at full speed. Playback is untimed:
+        # gravity ticks, clears and speed-ups are events of their own, so the
+        # game comes out the same without waiting. `ticks` keeps each event's
+        # gravity tick index for tools that want the timing.
+        engine = GameEngine(self.width, self.height, self.seed)
+        engine.spawn_piece()
+        apply = engine.apply
+        for action in self.actions:
+            apply(action)
+        return engine
+
+    def verify(self, engine=None):
+        engine = engine or self.play()
+        return (engine.score == self.score and engine.lines_cleared == self.lines_cleared
+                and board_crc(engine) == self.board_crc)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play back recorded games headless and check their results")
+    parser.add_argument('files', nargs='+', help="replay files (.mtr)")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    events = 0
+    started = perf_counter()
+    for path in args.files:
+        try:
+            replay = Replay.load(path)
+            engine = replay.play()
+        except (OSError, ReplayError) as e:
+            print(f"{path}: ERROR {e}")
+            failed += 1
+            continue
+        events += len(replay.actions)
+        if replay.verify(engine):
+            print(f"{path}: OK score={engine.score} lines={engine.lines_cleared}")
+        else:
+            print(f"{path}: MISMATCH score={engine.score} (expected {replay.score}) "
+                  f"lines={engine.lines_cleared} (expected {replay.lines_cleared})")
+            failed += 1
+    elapsed = perf_counter() - started
+    print(f"{len(args.files)} replays, {events} events in {elapsed:.2f}s "
+          f"({len(args.files) / max(elapsed, 1e-9):.1f} games/s), {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+import json
+
+from engine import GameEngine
+from gameloop import SPEED_UP_MS
+from pieces import PIECE_TYPES
+from replay import write_varint, read_varint, ReplayError
+
+# Layout: MAGIC, version byte, flags byte, then varints for high score, score,
+# level, speed, combo, lines cleared, width, height, seed, the timer phases
+# (ms already elapsed of the gravity, speed-up and fever timers), the piece
+# generator state as 8 bytes, the current piece (index << 2 | rotation), its
+# row and column, the next piece, the pending clears, and finally the board
+# as 3 bits per cell, row-major.
+MAGIC = b'MTS'
+VERSION = 1
+FLAG_ACTIVE = 1
+FLAG_FEVER = 2
+
+
+class SaveError(Exception):
+    pass
+
+
+class SaveGame:
+    def __init__(self, high_score=0, engine=None, active=False, gravity_phase=0,
+                 speed_phase=0, fever_phase=0, fever=False):
+        self.high_score = high_score
+        # GameEngine holding the saved game, or None
+        self.engine = engine
+        self.active = active
+        self.gravity_phase = gravity_phase
+        self.speed_phase = speed_phase
+        self.fever_phase = fever_phase
+        self.fever = fever
+
+
+def pack_cells(cells):
+    packed = shift = 0
+    for row in cells:
+        if not any(row):
+            shift += 3 * len(row)
+            continue
+        for v in row:
+            if v:
+                packed |= v << shift
+            shift += 3
+    return packed.to_bytes((shift + 7) // 8, 'little')
+
+
+def unpack_cells(data, width, height):
+    packed = int.from_bytes(data, 'little')
+    row_bits = width * 3
+    row_mask = (1 << row_bits) - 1
+    cells = []
+    for y in range(height):
+        bits = (packed >> (y * row_bits)) & row_mask
+        row = bytearray(width)
+        x = 0
+        while bits:
+            row[x] = bits & 7
+            bits >>= 3
+            x += 1
+        cells.append(row)
+    return cells
+
+
+def encode_save(save):
+    engine = save.engine
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    out.append((FLAG_ACTIVE if save.active else 0) | (FLAG_FEVER if save.fever else 0))
+    o = engine.orientation
+    piece = (o.index << 2 | o.rotation) if o else 0
+    next_piece = PIECE_TYPES.index(engine.next_piece) + 1 if engine.next_piece else 0
+    for value in (save.high_score, engine.score, engine.level, engine.speed, engine.combo,
+                  engine.lines_cleared, engine.width, engine.height, engine.seed,
+                  save.gravity_phase, save.speed_phase, save.fever_phase):
+        write_varint(out, value)
+    out += engine.rng.state.to_bytes(8, 'little')
+    for value in (piece, engine.current_pos[0], engine.current_pos[1], next_piece,
+                  len(engine.pending_clears)):
+        write_varint(out, value)
+    for lines in engine.pending_clears:
+        write_varint(out, len(lines))
+        for y in lines:
+            write_varint(out, y)
+    out += pack_cells(engine.cells)
+    return bytes(out)
+
+
+def decode_save(data, engine):
+    # Restores the saved game into `engine`, which must have the same board
+    # size. Raises SaveError for anything out of range.
+    if len(data) < 5 or data[:3] != MAGIC:
+        raise SaveError("Not a save file")
+    if data[3] != VERSION:
+        raise SaveError(f"Unsupported save version {data[3]}")
+    flags = data[4]
+    try:
+        values = []
+        pos = 5
+        for _ in range(12):
+            value, pos = read_varint(data, pos)
+            values.append(value)
+        (high_score, score, level, speed, combo, lines_cleared, width, height, seed,
+         gravity_phase, speed_phase, fever_phase) = values
+        rng_state_bytes = data[pos:pos + 8]
+        pos += 8
+        piece, pos = read_varint(data, pos)
+        row, pos = read_varint(data, pos)
+        col, pos = read_varint(data, pos)
+        next_piece, pos = read_varint(data, pos)
+        count, pos = read_varint(data, pos)
+        pending = []
+        for _ in range(count):
+            n, pos = read_varint(data, pos)
+            lines = []
+            for _ in range(n):
+                y, pos = read_varint(data, pos)
+                lines.append(y)
+            pending.append(lines)
+    except ReplayError:
+        raise SaveError("Truncated save file") from None
+    if len(rng_state_bytes) < 8 or len(data) - pos < (width * height * 3 + 7) // 8:
+        raise SaveError("Truncated save file")
+    if (width, height) != (engine.width, engine.height):
+        raise SaveError(f"Save is for a {width}x{height} board")
+
+    if not 100 <= speed <= 1000:
+        raise SaveError(f"Corrupt save file: bad speed {speed}")
+    # A speed-up can leave the gravity phase past the new, shorter period
+    gravity_phase = min(gravity_phase, speed)
+    speed_phase = min(speed_phase, SPEED_UP_MS - 1)
+    # Decoded into a scratch engine and checked before the caller's engine is
+    # touched, so a corrupt save leaves the current game as it was
+    saved = GameEngine(width, height, seed)
+    saved.set_cells(unpack_cells(data[pos:], width, height))
+    rng_state = int.from_bytes(rng_state_bytes, 'little')
+    if not rng_state:
+        raise SaveError("Corrupt save file: bad piece generator state")
+    saved.rng.state = rng_state
+    saved.score = score
+    saved.level = level
+    saved.speed = speed
+    saved.combo = combo
+    saved.lines_cleared = lines_cleared
+    if piece:
+        if not 1 <= piece >> 2 <= len(PIECE_TYPES):
+            raise SaveError(f"Corrupt save file: bad piece {piece >> 2}")
+        saved.set_piece(PIECE_TYPES[(piece >> 2) - 1], piece & 3)
+        o = saved.orientation
+        if col >= len(o.col_masks) or row + o.height > height:
+            raise SaveError(f"Corrupt save file: piece at ({row}, {col})")
+        saved.current_pos[0] = row
+        saved.current_pos[1] = col
+        if saved.check_collision() is True and flags & FLAG_ACTIVE:
+            raise SaveError(f"Corrupt save file: piece inside the stack at ({row}, {col})")
+        if pending:
+            # Rows still to clear hold the next piece back
+            raise SaveError("Corrupt save file: active piece with rows pending")
+    if next_piece > len(PIECE_TYPES):
+        raise SaveError(f"Corrupt save file: bad next piece {next_piece}")
+    saved.next_piece = PIECE_TYPES[next_piece - 1] if next_piece else None
+    for lines in pending:
+        if any(y >= height or saved.rows[y] != saved.full_mask for y in lines):
+            raise SaveError("Corrupt save file: bad pending clear")
+    saved.pending_clears.extend(pending)
+
+    engine.restore(saved)
+    return SaveGame(high_score, engine, bool(flags & FLAG_ACTIVE), gravity_phase,
+                    speed_phase, fever_phase, bool(flags & FLAG_FEVER))
+
+
+def migrate_json(data):
+    # Saves before the binary format never restored anything but the high score
+    try:
+        state = json.loads(data)
+        return SaveGame(int(state.get('high_score', 0)))
+    except (ValueError, AttributeError, TypeError) as e:
+        raise SaveError(f"Unreadable JSON save: {e}") from None
@@ -0,0 +1,96 @@
+import os
+import sys
+import threading
+from pathlib import Path
+from time import monotonic
+
+
+def save_dir():
+    # Per-user data directory holding state.sav, replays and profiles
+    if sys.platform == 'win32':
+        base = Path.home() / 'AppData' / 'Local'
+    else:
+        base = Path.home() / '.local' / 'share'
+    return base / 'MacanTetrisNeoArcade'
+
+
+def atomic_write(path, data):
+    # Write next to the target and swap it in, so readers never see a partial file
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class StateWriter:
+    # Background writer for save files. Jobs are keyed (by path for saves) and a
+    # newer job replaces a pending one with the same key, so bursts of saves
+    # coalesce into one write. Jobs wait `delay` seconds unless urgent.
+    def __init__(self, delay=0.5, max_pending=16):
+        self.delay = delay
+        self.max_pending = max_pending
+        self._pending = {}
+        self._busy = False
+        self._closing = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='StateWriter', daemon=True)
+        self._thread.start()
+
+    def save(self, path, producer, urgent=False):
+        # `producer` runs on the writer thread and returns the bytes to write
+        self.run(str(path), lambda: atomic_write(path, producer()), urgent)
+
+    def run(self, key, job, urgent=False):
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("StateWriter is closed")
+            while key not in self._pending and len(self._pending) >= self.max_pending:
+                self._cond.wait()
+            due = monotonic() if urgent else monotonic() + self.delay
+            if key in self._pending:
+                due = min(due, self._pending[key][0])
+            self._pending[key] = (due, job)
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        # Runs everything pending now and waits for it to finish
+        with self._cond:
+            self._pending = {key: (0, job) for key, (_, job) in self._pending.items()}
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def close(self, timeout=None):
+        with self._cond:
+            self._closing = True
+        self.flush(timeout)
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._pending:
+                        if self._closing:
+                            return
+                        self._cond.wait()
+                        continue
+                    wait = min(due for due, _ in self._pending.values()) - monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                jobs = [job for _, job in self._pending.values()]
+                self._pending = {}
+                self._busy = True
+                self._cond.notify_all()
+            for job in jobs:
+                try:
+                    job()
+                except Exception as e:
+                    print(f"Save error: {e}")
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
@@ -0,0 +1,235 @@
+import os
+import sys
+import time
+import queue
+import random
+import struct
+import argparse
+import threading
+from pathlib import Path
+
+from pieces import PIECE_TYPES
+from storage import save_dir
+
+TELEMETRY_ENV = 'MACAN_TELEMETRY'  # 1 to log events, or the directory to log them to
+
+# Event types
+LOCK = 0
+CLEAR = 1
+FEVER = 2
+SPEED_UP = 3
+GAME_OVER = 4
+EVENT_NAMES = ('lock', 'clear', 'fever', 'speed_up', 'game_over')
+
+# File layout: MAGIC, version and record size (u16 each), then fixed-size
+# little-endian records. A crash can only leave a partial record at the end.
+MAGIC = b'MTEV'
+VERSION = 1
+HEADER = struct.Struct('<4sHH')
+# time, session, score, score delta, game, row, col, combo, event, piece, rotation, lines
+RECORD = struct.Struct('<dIiiHhhHBBBB')
+FIELDS = (('time', '<f8'), ('session', '<u4'), ('score', '<i4'), ('score_delta', '<i4'),
+          ('game', '<u2'), ('row', '<i2'), ('col', '<i2'), ('combo', '<u2'),
+          ('event', 'u1'), ('piece', 'u1'), ('rotation', 'u1'), ('lines', 'u1'))
+
+BUFFER_BYTES = 64 * 1024  # Handed to the writer thread when this full
+MAX_FILE_BYTES = 8 * 1024 * 1024  # Then the writer starts a new file
+KEEP_FILES = 64  # Oldest files beyond this are deleted; 0 keeps them all
+
+
+def telemetry_dir():
+    return save_dir() / 'telemetry'
+
+
+def telemetry_from_env():
+    # The directory MACAN_TELEMETRY asks for, or None when it's off
+    value = os.environ.get(TELEMETRY_ENV, '')
+    if value in ('', '0'):
+        return None
+    return telemetry_dir() if value == '1' else Path(value)
+
+
+class TelemetryWriter:
+    # Opt-in per-piece event log. log() packs a record into an in-memory
+    # buffer; full buffers go to a background thread that appends them to
+    # events-*.mtev files, starting a new file every `max_bytes`.
+    def __init__(self, directory=None, session=None, max_bytes=MAX_FILE_BYTES, keep=KEEP_FILES,
+                 buffer_bytes=BUFFER_BYTES):
+        self.directory = Path(directory or telemetry_dir())
+        self.session = random.getrandbits(32) if session is None else session
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.buffer_bytes = buffer_bytes
+        self.game = 0
+        self.records = 0
+        self._buffer = bytearray()
+        self._file = None
+        self._size = 0
+        self._jobs = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name='Telemetry', daemon=True)
+        self._thread.start()
+
+    def new_game(self):
+        self.game = (self.game + 1) & 0xffff
+
+    def log(self, event, engine, score_delta=0, lines=0, placement=None):
+        # The current piece (if any) gives the piece, position and rotation,
+        # unless `placement` (orientation, row, col) names an earlier one
+        if placement:
+            o, row, col = placement
+        else:
+            o = engine.orientation
+            row, col = engine.current_pos
+        self._buffer += RECORD.pack(
+            time.time(), self.session, engine.score, score_delta, self.game, row, col,
+            min(engine.combo, 0xffff), event, o.index if o else 0, o.rotation if o else 0,
+            min(lines, 0xff))
+        self.records += 1
+        if len(self._buffer) >= self.buffer_bytes:
+            self.flush()
+
+    def flush(self):
+        # Hands whatever is buffered to the writer thread; never blocks
+        if self._buffer:
+            self._jobs.put(bytes(self._buffer))
+            self._buffer.clear()
+
+    def close(self, timeout=None):
+        self.flush()
+        self._jobs.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            data = self._jobs.get()
+            if data is None:
+                break
+            try:
+                self._write(data)
+            except OSError as e:
+                print(f"Telemetry error: {e}")
+                self._close_file()
+        self._close_file()
+
+    def _write(self, data):
+        if self._file and self._size + len(data) > self.max_bytes:
+            self._close_file()
+        if not self._file:
+            self._open_file()
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+
+    def _open_file(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        path = self.directory / f"events-{stamp}-{self.session:08x}.mtev"
+        n = 1
+        while path.exists():
+            n += 1
+            path = self.directory / f"events-{stamp}-{self.session:08x}-{n}.mtev"
+        self._file = open(path, 'ab')
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self._size = HEADER.size
+        if self.keep:
+            # Names sort by creation time
+            for old in sorted(self.directory.glob('events-*.mtev'))[:-self.keep]:
+                old.unlink(missing_ok=True)
+
+    def _close_file(self):
+        if self._file:
+            try:
+                self._file.close()
+            except OSError as e:
+                print(f"Telemetry error: {e}")
+            self._file = None
+
+
+def event_dtype():
+    import numpy as np
+    return np.dtype(list(FIELDS))
+
+
+def iter_events(paths, chunk=65536):
+    # Streams records into NumPy structured arrays of up to `chunk` records
+    # per file, so any number of sessions can be scanned in bounded memory.
+    # `paths` are .mtev files or directories of them.
+    import numpy as np
+    dtype = event_dtype()
+    for path in expand_paths(paths):
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                continue
+            magic, version, size = HEADER.unpack(header)
+            if magic != MAGIC or size != dtype.itemsize:
+                raise ValueError(f"{path}: not a version {VERSION} telemetry file")
+            while True:
+                data = f.read(chunk * size)
+                # A partial trailing record (the writer was killed) is dropped
+                count = len(data) // size
+                if count:
+                    yield np.frombuffer(data, dtype, count)
+                if len(data) < chunk * size:
+                    break
+
+
+def load_events(paths):
+    # Every record in `paths` as one structured array
+    import numpy as np
+    arrays = list(iter_events(paths))
+    return np.concatenate(arrays) if arrays else np.zeros(0, event_dtype())
+
+
+def expand_paths(paths):
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            yield from sorted(path.glob('events-*.mtev'))
+        else:
+            yield path
+
+
+def main(argv=None):
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description="Summarize telemetry event logs")
+    parser.add_argument('paths', nargs='*', type=Path,
+                        help="event files or directories (default: the telemetry directory)")
+    args = parser.parse_args(argv)
+
+    try:
+        events = load_events(args.paths or [telemetry_dir()])
+    except (OSError, ValueError) as e:
+        print(f"Telemetry error: {e}")
+        return 1
+    if not len(events):
+        print("No telemetry events")
+        return 1
+    sessions = len(np.unique(events['session']))
+    games = len(np.unique(events[['session', 'game']]))
+    print(f"{len(events)} events, {sessions} sessions, {games} games")
+    for code, name in enumerate(EVENT_NAMES):
+        print(f"  {name:<10}{np.count_nonzero(events['event'] == code):>10}")
+
+    locks = events[events['event'] == LOCK]
+    if len(locks):
+        print("Pieces placed:")
+        counts = np.bincount(locks['piece'], minlength=len(PIECE_TYPES) + 1)
+        print("  " + "  ".join(f"{p} {counts[i + 1]}" for i, p in enumerate(PIECE_TYPES)))
+        print(f"  mean column {locks['col'].mean():.2f}, mean row {locks['row'].mean():.2f}")
+    clears = events[events['event'] == CLEAR]
+    if len(clears):
+        counts = np.bincount(clears['lines'], minlength=5)
+        print("Clears: " + "  ".join(f"{n}-line {counts[n]}" for n in range(1, len(counts))
+                                     if counts[n]))
+        print(f"  points {clears['score_delta'].sum()}, best combo {clears['combo'].max()}")
+    ends = events[events['event'] == GAME_OVER]
+    if len(ends):
+        print(f"Games over: {len(ends)}, mean score {ends['score'].mean():.0f}, "
+              f"best {ends['score'].max()}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
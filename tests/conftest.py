@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# The game's modules live at the top of the repo
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Headless and silent, with saves, replays and the leaderboard in a
+# throwaway home directory
+os.environ.update(HOME=tempfile.mkdtemp(prefix='macan-tests-'), MACAN_AUDIO='null')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+for name in ('MACAN_BOT', 'MACAN_PROFILE', 'MACAN_TELEMETRY'):
+    os.environ.pop(name, None)
+
+
+@pytest.fixture(autouse=True)
+def home(tmp_path, monkeypatch):
+    # Each test starts without a save file or leaderboard
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setenv('USERPROFILE', str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    QApplication = pytest.importorskip('PySide6.QtWidgets').QApplication
+    return QApplication.instance() or QApplication(sys.argv[:1])
+
+
+@pytest.fixture
+def window(qapp):
+    # A shown game window with its clocks stopped, so tests drive it by hand
+    import gui
+    w = gui.MacanTetrisNeo()
+    w.show()
+    qapp.processEvents()
+    w.frame_timer.stop()
+    w.hud_timer.stop()
+    yield w
+    w.close()
+    qapp.processEvents()
@@ -0,0 +1,26 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from engine import GameEngine
+from gameloop import SPEED_UP_MS
+from batch import BatchEngine, play_one_at_a_time
+
+
+def test_speed_ups_follow_the_game_clock():
+    batch = BatchEngine(10, seed=5)
+    moves = []
+    for _ in range(40):
+        rotations, cols = batch.greedy_placements()
+        batch.step(rotations, cols)
+        batch.apply_speed_ups()
+        moves.append((rotations, cols))
+    assert (batch.speed < 1000).all()
+    for i in range(batch.n):
+        # One speed-up per 30 seconds of play, as the window's loop would fire them
+        engine = GameEngine()
+        for _ in range(int(batch.clock[i]) // SPEED_UP_MS):
+            engine.increase_speed()
+        assert engine.speed == batch.speed[i]
+    # The one-game-at-a-time loop replays exactly the same games
+    assert play_one_at_a_time(batch.seeds, moves) == batch.pieces_placed.sum()
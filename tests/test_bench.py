@@ -0,0 +1,30 @@
+import json
+
+import bench
+
+
+def run(tmp_path, *args):
+    return bench.main(['--no-qt', '--only', 'rotate.empty', '--repeat', '1',
+                       '--out', str(tmp_path / 'results.json'), *args])
+
+
+def test_threshold_breach_fails(tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    assert run(tmp_path, '--baseline', str(baseline), '--save-baseline') == 0
+    report = json.loads(baseline.read_text())
+    # Same results against themselves pass
+    assert run(tmp_path, '--baseline', str(baseline), '--threshold-for', 'rotate.*=10') == 0
+    report['results']['rotate.empty']['us'] /= 100
+    baseline.write_text(json.dumps(report))
+    assert run(tmp_path, '--baseline', str(baseline)) == 1
+
+
+def test_missing_baseline_fails(tmp_path):
+    assert run(tmp_path, '--baseline', str(tmp_path / 'missing.json')) == 1
+
+
+def test_threshold_for():
+    overrides = [('rotate.*', 0.1)]
+    assert bench.threshold_for('rotate.half', overrides) == 0.1
+    assert bench.threshold_for('paint.half', overrides) == bench.THRESHOLDS['paint.*']
+    assert bench.threshold_for('hard_drop.half', overrides) == bench.THRESHOLD
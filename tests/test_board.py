@@ -0,0 +1,39 @@
+from pieces import BOARD_WIDTH, BOARD_HEIGHT
+
+
+def grab(qapp, window):
+    qapp.processEvents()
+    return qapp.primaryScreen().grabWindow(window.winId()).toImage()
+
+
+def test_clear_repaints_like_a_full_repaint(qapp, window):
+    # The bottom two rows are full but for columns 0 and 1; an O piece
+    # dropped there clears them while the next piece's ghost sits above
+    engine = window.engine
+    cells = [bytes(BOARD_WIDTH)] * (BOARD_HEIGHT - 2)
+    cells += [bytes([0, 0] + [3] * (BOARD_WIDTH - 2))] * 2
+    engine.set_cells(cells)
+    engine.set_piece('O')
+    engine.current_pos[:] = [0, 0]
+    window.board_widget.refresh_all()
+    grab(qapp, window)
+
+    window.fast_drop()
+    grab(qapp, window)
+    window.complete_clear()
+    incremental = grab(qapp, window)
+    window.board_widget.refresh_all()
+    assert grab(qapp, window) == incremental
+
+
+def test_clear_in_the_spawn_area_does_not_end_the_game(qapp, window):
+    from test_engine import spawn_area_cells
+    engine = window.engine
+    engine.set_cells(spawn_area_cells())
+    engine.set_piece('O')
+    engine.current_pos[:] = [0, 0]
+    window.fast_drop()
+    assert window.game_active and window.loop.frozen and engine.orientation is None
+    window.complete_clear()
+    assert window.game_active and not window.loop.frozen
+    assert engine.orientation and engine.current_pos[0] == 0
@@ -0,0 +1,34 @@
+from bot import AutoPlayer, SEARCH_COLUMNS
+from engine import GameEngine, CLEAR
+
+
+def test_standard_board_searches_every_column():
+    engine = GameEngine(seed=1)
+    engine.spawn_piece()
+    assert AutoPlayer().window(engine) == (0, engine.width)
+
+
+def test_wide_board_searches_the_lowest_stretch():
+    engine = GameEngine(200, 400, seed=1)
+    engine.spawn_piece()
+    bot = AutoPlayer()
+    lo, hi = bot.window(engine)
+    assert hi - lo == SEARCH_COLUMNS and lo <= engine.current_pos[1] < hi
+
+    # A stack everywhere but columns 150-179 moves the search there
+    cells = [bytes(200)] * 396 + [bytes([1] * 150 + [0] * 30 + [1] * 20)] * 4
+    engine.set_cells(cells)
+    lo, hi = bot.window(engine)
+    assert 150 <= lo and hi <= 180
+    o, col = bot.plan(engine)
+    assert lo <= col and col + o.width <= hi
+
+
+def test_wide_board_bot_plays():
+    engine = GameEngine(60, 40, seed=2)
+    engine.spawn_piece()
+    bot = AutoPlayer()
+    while engine.pieces_placed < 150 and not engine.game_over:
+        if engine.apply(bot.next_input(engine)):
+            engine.apply(CLEAR)
+    assert engine.pieces_placed == 150 and engine.lines_cleared
@@ -0,0 +1,46 @@
+from engine import GameEngine, HARD_DROP, CLEAR
+from pieces import BOARD_WIDTH, BOARD_HEIGHT
+from replay import ReplayRecorder, Replay
+from bot import AutoPlayer
+
+
+def spawn_area_cells():
+    # The two spawn rows are full but for columns 0 and 1, over a stack that
+    # leaves only the last column open; an O dropped in the corner completes
+    # the spawn rows
+    return ([bytes([0, 0] + [3] * (BOARD_WIDTH - 2))] * 2
+            + [bytes([3] * (BOARD_WIDTH - 1) + [0])] * (BOARD_HEIGHT - 2))
+
+
+def test_spawn_waits_for_the_clear():
+    engine = GameEngine(seed=1)
+    engine.spawn_piece()
+    engine.set_cells(spawn_area_cells())
+    engine.set_piece('O')
+    engine.current_pos[:] = [0, 0]
+    next_piece = engine.next_piece
+
+    assert engine.apply(HARD_DROP) == [0, 1]
+    # The rows about to go are left alone: no piece, no top-out, no input
+    assert engine.orientation is None and not engine.game_over
+    assert engine.apply(HARD_DROP) is None
+
+    engine.apply(CLEAR)
+    assert not engine.game_over
+    assert engine.current_piece == next_piece and engine.current_pos == [0, engine.spawn_col]
+    assert engine.lines_cleared == 2
+
+
+def test_replay_of_deferred_spawns():
+    engine = GameEngine(seed=4)
+    engine.spawn_piece()
+    recorder = ReplayRecorder(engine)
+    bot = AutoPlayer()
+    while engine.pieces_placed < 200 and not engine.game_over:
+        action = bot.next_input(engine)
+        recorder.record(action)
+        if engine.apply(action):
+            recorder.record(CLEAR)
+            engine.apply(CLEAR)
+    assert engine.lines_cleared
+    assert Replay(recorder.to_bytes(engine)).verify()
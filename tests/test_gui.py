@@ -0,0 +1,35 @@
+from pieces import BOARD_WIDTH, BOARD_HEIGHT
+
+
+def test_bad_tuning_values_keep_the_defaults(monkeypatch, capsys):
+    import gui
+    monkeypatch.setenv('MACAN_DAS', 'fast')
+    monkeypatch.setenv('MACAN_BOT_DELAY', '80')
+    assert gui.env_int('MACAN_DAS', gui.DAS_MS) == gui.DAS_MS
+    assert 'MACAN_DAS' in capsys.readouterr().out
+    assert gui.env_int('MACAN_BOT_DELAY', 50) == 80
+    assert gui.env_int('MACAN_ARR', gui.ARR_MS) == gui.ARR_MS
+
+
+def test_rotate_reports_whether_the_piece_turned(window):
+    engine = window.engine
+    window.game_active = True
+    engine.set_cells([bytes(BOARD_WIDTH)] * BOARD_HEIGHT)
+    engine.set_piece('T')
+    engine.current_pos[:] = [BOARD_HEIGHT // 2, BOARD_WIDTH // 2]
+    assert window.rotate() is True
+    # A flat I piece in a one-row slot has nowhere to turn
+    engine.set_piece('I')
+    engine.current_pos[:] = [BOARD_HEIGHT - 1, 0]
+    blocked = [bytes([1] * BOARD_WIDTH)] * (BOARD_HEIGHT - 1)
+    engine.set_cells(blocked + [bytes(4) + bytes([1] * (BOARD_WIDTH - 4))])
+    assert window.rotate() is False
+
+
+def test_leaderboard_panel_shows_the_players_best(qapp):
+    import gui
+    panel = gui.LeaderboardPanel()
+    panel.show_snapshot({'top': [('ANA', 900, 4, '')], 'today': [], 'player_best': 700})
+    assert panel.player_best.text().split() == ['YOUR', 'BEST', '700']
+    panel.show_snapshot({'top': [], 'today': [], 'player_best': 0})
+    assert panel.player_best.text() == 'YOUR BEST -'
@@ -0,0 +1,76 @@
+import asyncio
+
+import versus
+from netplay import VersusServer, frame, read_frame
+
+
+async def connect(port, name, width=10, height=20):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(frame(versus.hello(name, width, height)))
+    await writer.drain()
+    return reader, writer
+
+
+async def receive(reader):
+    return await asyncio.wait_for(read_frame(reader), 2)
+
+
+def run_server(test):
+    async def main():
+        server = VersusServer(seed=1)
+        listener = await asyncio.start_server(server.handle, '127.0.0.1', 0)
+        async with listener:
+            await test(server, listener.sockets[0].getsockname()[1])
+    asyncio.run(main())
+
+
+def test_pairs_clients_and_starts_rounds():
+    async def test(server, port):
+        a_reader, a = await connect(port, 'A')
+        a.write(frame(versus.message(versus.READY)))
+        b_reader, b = await connect(port, 'B')
+        b.write(frame(versus.message(versus.READY)))
+        assert versus.OpponentState.from_hello(await receive(a_reader)).name == 'B'
+        assert versus.OpponentState.from_hello(await receive(b_reader)).name == 'A'
+        # A's READY was sent before it had an opponent
+        start_a, start_b = await receive(a_reader), await receive(b_reader)
+        assert start_a[0] == versus.START and start_a == start_b
+        a.close()
+        assert (await receive(b_reader))[0] == versus.BYE
+        b.close()
+    run_server(test)
+
+
+def test_waiting_client_that_leaves_is_not_paired():
+    async def test(server, port):
+        _, a = await connect(port, 'A')
+        for _ in range(100):
+            if server.waiting:
+                break
+            await asyncio.sleep(0.01)
+        a.close()
+        for _ in range(100):
+            if server.waiting is None:
+                break
+            await asyncio.sleep(0.01)
+        assert server.waiting is None
+
+        b_reader, b = await connect(port, 'B')
+        c_reader, c = await connect(port, 'C')
+        assert versus.OpponentState.from_hello(await receive(b_reader)).name == 'C'
+        assert versus.OpponentState.from_hello(await receive(c_reader)).name == 'B'
+        b.write(frame(versus.garbage(2)))
+        assert await receive(c_reader) == versus.garbage(2)
+        b.close()
+        c.close()
+    run_server(test)
+
+
+def test_unplayable_hello_is_refused():
+    async def test(server, port):
+        reader, writer = await connect(port, 'X', 1000, 20)
+        assert await receive(reader) is None
+        assert server.waiting is None
+        writer.close()
+    run_server(test)
+
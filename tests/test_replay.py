@@ -0,0 +1,35 @@
+import pytest
+
+from engine import GameEngine, GRAVITY, MOVE_LEFT
+from replay import MAGIC, VERSION, ReplayRecorder, Replay, ReplayError, write_varint
+
+
+def header(seed=1, width=10, height=20, count=0):
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    for value in (seed, width, height, count):
+        write_varint(out, value)
+    return out
+
+
+def test_ticks_are_kept_but_playback_is_untimed():
+    engine = GameEngine(seed=2)
+    engine.spawn_piece()
+    recorder = ReplayRecorder(engine)
+    for action in (MOVE_LEFT, GRAVITY, GRAVITY, MOVE_LEFT, GRAVITY):
+        recorder.record(action)
+        engine.apply(action)
+    replay = Replay(recorder.to_bytes(engine))
+    assert replay.ticks == [0, 0, 1, 2, 2]
+    assert replay.verify()
+
+
+def test_event_count_beyond_the_payload():
+    with pytest.raises(ReplayError):
+        Replay(bytes(header(count=1 << 40)))
+
+
+@pytest.mark.parametrize('width, height', [(0, 20), (10, 0), (1000, 20)])
+def test_unplayable_board(width, height):
+    with pytest.raises(ReplayError):
+        Replay(bytes(header(width=width, height=height)) + bytes(3))
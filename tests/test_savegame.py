@@ -0,0 +1,117 @@
+import pytest
+
+from engine import GameEngine
+from pieces import PIECE_TYPES, BOARD_WIDTH, BOARD_HEIGHT
+from replay import write_varint
+from savegame import MAGIC, VERSION, FLAG_ACTIVE, SaveGame, SaveError, encode_save, decode_save, pack_cells
+
+
+FULL_BOTTOM = [bytes(BOARD_WIDTH)] * (BOARD_HEIGHT - 1) + [bytes([2] * BOARD_WIDTH)]
+
+
+def payload(flags=FLAG_ACTIVE, **fields):
+    # A save in the current layout; keyword arguments override the defaults
+    f = dict(high_score=5, score=300, level=1, speed=1000, combo=0, lines=3,
+             width=BOARD_WIDTH, height=BOARD_HEIGHT, seed=7, gravity=0, speed_up=0,
+             fever=0, rng=1, piece=(1 << 2), row=0, col=3, next_piece=2, pending=(),
+             cells=[bytes(BOARD_WIDTH)] * BOARD_HEIGHT)
+    f.update(fields)
+    out = bytearray(MAGIC)
+    out += bytes([VERSION, flags])
+    for key in ('high_score', 'score', 'level', 'speed', 'combo', 'lines', 'width', 'height',
+                'seed', 'gravity', 'speed_up', 'fever'):
+        write_varint(out, f[key])
+    out += f['rng'].to_bytes(8, 'little')
+    for key in ('piece', 'row', 'col', 'next_piece'):
+        write_varint(out, f[key])
+    write_varint(out, len(f['pending']))
+    for lines in f['pending']:
+        write_varint(out, len(lines))
+        for y in lines:
+            write_varint(out, y)
+    out += pack_cells(f['cells'])
+    return bytes(out)
+
+
+def playing_engine():
+    engine = GameEngine(seed=3)
+    engine.spawn_piece()
+    for _ in range(5):
+        engine.hard_drop()
+        engine.spawn_piece()
+    return engine
+
+
+def snapshot(engine):
+    return (engine.score, engine.rows[:], [bytes(r) for r in engine.cells], engine.current_piece,
+            list(engine.current_pos), engine.next_piece, engine.rng.state)
+
+
+def test_round_trip():
+    engine = playing_engine()
+    restored = GameEngine()
+    save = decode_save(encode_save(SaveGame(9, engine, True)), restored)
+    assert save.high_score == 9 and save.active
+    assert snapshot(restored) == snapshot(engine)
+    assert restored.heights == engine.heights
+
+
+def test_valid_payload():
+    save = decode_save(payload(), GameEngine())
+    assert save.engine.current_piece == PIECE_TYPES[0]
+    assert save.engine.next_piece == PIECE_TYPES[1]
+
+
+@pytest.mark.parametrize('fields', [
+    dict(piece=9 << 2),
+    dict(piece=(len(PIECE_TYPES) + 1) << 2),
+    dict(row=30, col=40),
+    dict(col=BOARD_WIDTH),
+    dict(row=BOARD_HEIGHT),
+    dict(next_piece=9),
+    dict(pending=[[BOARD_HEIGHT + 5]]),
+    dict(pending=[[BOARD_HEIGHT - 1]]),  # not a full row
+    dict(cells=[bytes([1] * BOARD_WIDTH)] * BOARD_HEIGHT, pending=()),  # piece in the stack
+    dict(cells=FULL_BOTTOM, pending=[[BOARD_HEIGHT - 1]]),  # piece while rows are pending
+    dict(speed=0),
+    dict(rng=0),
+    dict(width=12),
+])
+def test_corrupt_payload_leaves_engine_alone(fields):
+    engine = playing_engine()
+    before = snapshot(engine)
+    with pytest.raises(SaveError):
+        decode_save(payload(**fields), engine)
+    assert snapshot(engine) == before
+
+
+def test_pending_clear_without_a_piece():
+    save = decode_save(payload(piece=0, cells=FULL_BOTTOM, pending=[[BOARD_HEIGHT - 1]]),
+                       GameEngine())
+    assert save.engine.orientation is None
+    assert list(save.engine.pending_clears) == [[BOARD_HEIGHT - 1]]
+
+
+def test_game_over_save_keeps_its_blocked_piece():
+    # The piece that couldn't spawn is saved with the finished game
+    cells = [bytes([1] * BOARD_WIDTH)] * BOARD_HEIGHT
+    save = decode_save(payload(flags=0, cells=cells), GameEngine())
+    assert not save.active and save.high_score == 5
+
+
+def test_truncated_payload():
+    data = payload()
+    for size in (0, 4, 10, 30, len(data) - 1):
+        with pytest.raises(SaveError):
+            decode_save(data[:size], GameEngine())
+
+
+def test_corrupt_save_does_not_stop_the_window(qapp, tmp_path, monkeypatch):
+    import gui
+    monkeypatch.setattr(gui, 'save_dir', lambda: tmp_path)
+    (tmp_path / 'state.sav').write_bytes(payload(piece=9 << 2))
+    window = gui.MacanTetrisNeo()
+    try:
+        assert window.game_active and window.engine.orientation
+    finally:
+        window.close()
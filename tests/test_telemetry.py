@@ -0,0 +1,50 @@
+import pytest
+
+import telemetry
+from engine import GameEngine
+from pieces import BOARD_WIDTH, BOARD_HEIGHT
+
+np = pytest.importorskip('numpy')
+
+
+def test_records_round_trip(tmp_path):
+    engine = GameEngine(seed=1)
+    engine.spawn_piece()
+    writer = telemetry.TelemetryWriter(tmp_path, session=5, buffer_bytes=64)
+    for _ in range(10):
+        writer.log(telemetry.LOCK, engine)
+    writer.log(telemetry.GAME_OVER, engine, lines=3)
+    writer.close()
+    events = telemetry.load_events([tmp_path])
+    assert len(events) == 11
+    assert (events['session'] == 5).all()
+    assert events['event'][-1] == telemetry.GAME_OVER and events['lines'][-1] == 3
+    assert events['piece'][0] == engine.orientation.index
+
+
+def test_clear_names_the_piece_that_locked(qapp, tmp_path, monkeypatch):
+    import gui
+    monkeypatch.setenv(telemetry.TELEMETRY_ENV, str(tmp_path))
+    window = gui.MacanTetrisNeo()
+    window.frame_timer.stop()
+    try:
+        # The bottom row is full but for column 0, which an upright I fills
+        engine = window.engine
+        cells = [bytes(BOARD_WIDTH)] * (BOARD_HEIGHT - 1) + [bytes([0] + [2] * (BOARD_WIDTH - 1))]
+        engine.set_cells(cells)
+        engine.set_piece('I', 1)
+        engine.current_pos[:] = [0, 0]
+        window.fast_drop()
+        window.complete_clear()
+    finally:
+        window.close()
+
+    events = telemetry.load_events([tmp_path])
+    clears = np.flatnonzero(events['event'] == telemetry.CLEAR)
+    assert len(clears) == 1
+    lock, clear = events[clears[0] - 1], events[clears[0]]
+    assert lock['event'] == telemetry.LOCK and clear['lines'] == 1
+    assert clear['score_delta'] == 100
+    for field in ('piece', 'rotation', 'row', 'col'):
+        assert clear[field] == lock[field], field
+    assert (lock['row'], lock['col'], lock['rotation']) == (BOARD_HEIGHT - 4, 0, 1)
@@ -0,0 +1,80 @@
+import pytest
+
+import versus
+from engine import GameEngine
+from pieces import MAX_BOARD_WIDTH
+
+
+def synced():
+    engine = GameEngine(seed=1)
+    engine.spawn_piece()
+    engine.hard_drop()
+    engine.spawn_piece()
+    opponent = versus.OpponentState('A', engine.width, engine.height)
+    opponent.apply(versus.BoardSync().delta(engine))
+    return engine, opponent
+
+
+def board(piece=1, rotation=0, row=0, col=3, first=0, rows=(), score=0, width=10):
+    row_bytes = (width + 7) // 8
+    return versus.BOARD_HEADER.pack(versus.BOARD, score, 0, first, len(rows), piece, rotation,
+                                    row, col) + b''.join(r.to_bytes(row_bytes, 'little')
+                                                         for r in rows)
+
+
+def test_delta_round_trip():
+    engine, opponent = synced()
+    assert opponent.rows == engine.rows
+    assert opponent.orientation is engine.orientation
+    assert opponent.pos == tuple(engine.current_pos)
+
+
+@pytest.mark.parametrize('payload', [
+    board(piece=9),
+    board(piece=8),
+    board(row=30, col=40),
+    board(row=-1),
+    board(col=9),
+    board(first=19, rows=(1, 2)),
+    board(rows=(1,))[:-1],
+    board()[:5],
+])
+def test_bad_board_is_rejected(payload):
+    _, opponent = synced()
+    before = (opponent.rows[:], opponent.orientation, opponent.pos, opponent.score)
+    with pytest.raises(versus.VersusError):
+        opponent.apply(payload)
+    assert (opponent.rows, opponent.orientation, opponent.pos, opponent.score) == before
+
+
+@pytest.mark.parametrize('size', [(0, 20), (10, 2), (MAX_BOARD_WIDTH + 1, 20), (65535, 65535)])
+def test_bad_hello_is_rejected(size):
+    with pytest.raises(versus.VersusError):
+        versus.OpponentState.from_hello(versus.hello('X', *size))
+
+
+def test_hello():
+    opponent = versus.OpponentState.from_hello(versus.hello('Macan', 12, 24))
+    assert (opponent.name, opponent.width, opponent.height) == ('Macan', 12, 24)
+
+
+def test_window_survives_bad_payloads(qapp):
+    import gui
+    a, b = versus.loopback_pair(seed=1)
+    window = gui.MacanTetrisNeo(link=a)
+    try:
+        b.send(versus.hello('B', 10, 20))
+        b.send(versus.message(versus.READY))
+        window.versus_step()
+        assert window.game_active and window.opponent
+        for payload in (board(piece=9), board(row=50), b'', bytes([versus.GARBAGE]),
+                        bytes([versus.START, 1])):
+            b.send(payload)
+        window.versus_step()
+        assert window.game_active and window.incoming_garbage == 0
+
+        b.send(versus.hello('C', 1000, 20))
+        window.versus_step()
+        assert not window.link_open and not window.game_active
+    finally:
+        window.close()
@@ -0,0 +1,139 @@
+import os
+import sys
+import heapq
+import argparse
+import multiprocessing
+from functools import partial
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor
+
+# Workers import only the headless modules below; PySide6 must stay out of them
+from engine import GameEngine, GRAVITY, CLEAR
+from bot import AutoPlayer
+from profiler import RollingHistogram
+from gameloop import SPEED_UP_MS, CLEAR_MS
+
+STATS = ('score', 'lines', 'max_combo', 'fevers', 'pieces', 'minutes')
+
+# Simulated timer events, in the order they're handled when due together
+EVENT_SPEED_UP = 0
+EVENT_GRAVITY = 1
+EVENT_INPUT = 2
+
+
+class GameStats:
+    __slots__ = ('seed',) + STATS
+
+    def __init__(self, seed):
+        self.seed = seed
+        self.score = 0
+        self.lines = 0
+        self.max_combo = 0
+        self.fevers = 0
+        self.pieces = 0
+        self.minutes = 0.0
+
+
+def play_game(seed, max_pieces=1000, input_ms=50, speed_up_ms=SPEED_UP_MS):
+    # One autoplayer game on a simulated clock: gravity at the engine speed, a
+    # speed-up every `speed_up_ms`, one bot input every `input_ms` and the
+    # game frozen for the flash before each clear, as the window would run them
+    engine = GameEngine(seed=seed)
+    engine.spawn_piece()
+    bot = AutoPlayer()
+    stats = GameStats(seed)
+    events = [(engine.speed, EVENT_GRAVITY), (speed_up_ms, EVENT_SPEED_UP),
+              (input_ms, EVENT_INPUT)]
+    now = 0
+    while not engine.game_over and engine.pieces_placed < max_pieces:
+        now, event = heapq.heappop(events)
+        if event == EVENT_SPEED_UP:
+            engine.increase_speed()
+            heapq.heappush(events, (now + speed_up_ms, EVENT_SPEED_UP))
+            continue
+        if event == EVENT_GRAVITY:
+            lines = engine.apply(GRAVITY)
+            heapq.heappush(events, (now + engine.speed, EVENT_GRAVITY))
+        else:
+            action = bot.next_input(engine)
+            lines = engine.apply(action) if action is not None else None
+            heapq.heappush(events, (now + input_ms, EVENT_INPUT))
+        if lines:
+            # Every timer is paused for the flash; shifting them all keeps the heap
+            now += CLEAR_MS
+            events = [(due + CLEAR_MS, kind) for due, kind in events]
+            engine.apply(CLEAR)
+            stats.fevers += len(lines) == 4
+            stats.max_combo = max(stats.max_combo, engine.combo)
+
+    stats.score = engine.score
+    stats.lines = engine.lines_cleared
+    stats.pieces = engine.pieces_placed
+    stats.minutes = now / 60000
+    return stats
+
+
+def check_worker():
+    if 'PySide6' in sys.modules:
+        raise RuntimeError("PySide6 was imported into a tournament worker")
+
+
+def run(seeds, workers=None, **options):
+    # Plays every seed across a process pool; yields GameStats as games finish
+    # in seed order. Workers are spawned fresh so nothing from the parent
+    # process (such as Qt) is inherited.
+    context = multiprocessing.get_context('spawn')
+    workers = workers or os.cpu_count() or 1
+    chunk = max(1, len(seeds) // (workers * 8))
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=check_worker) as pool:
+        yield from pool.map(partial(play_game, **options), seeds, chunksize=chunk)
+
+
+def summarize(results):
+    lines = []
+    for name in STATS:
+        hist = RollingHistogram(max(1, len(results)))
+        for stats in results:
+            hist.add(getattr(stats, name))
+        mean = sum(getattr(stats, name) for stats in results) / max(1, len(results))
+        low, p10, p50, p90, top = hist.percentiles(0, 10, 50, 90, 100)
+        lines.append(f"{name:>10}  mean={mean:10.1f}  min={low:9.1f}  p10={p10:9.1f}  "
+                     f"p50={p50:9.1f}  p90={p90:9.1f}  max={top:9.1f}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play seeded autoplayer games on every core and "
+                                                 "report score, line and combo distributions")
+    parser.add_argument('-n', '--games', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0, help="first seed; games use seed..seed+n-1")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="default: all cores")
+    parser.add_argument('--max-pieces', type=int, default=1000, help="cap per game")
+    parser.add_argument('--input-ms', type=int, default=50, help="time between bot inputs")
+    parser.add_argument('--speed-up-ms', type=int, default=SPEED_UP_MS,
+                        help="time between speed-ups")
+    args = parser.parse_args(argv)
+
+    seeds = list(range(args.seed, args.seed + args.games))
+    results = []
+    started = perf_counter()
+    try:
+        for stats in run(seeds, args.workers, max_pieces=args.max_pieces,
+                         input_ms=args.input_ms, speed_up_ms=args.speed_up_ms):
+            results.append(stats)
+    except KeyboardInterrupt:
+        print(f"Interrupted after {len(results)} games")
+    elapsed = perf_counter() - started
+    if not results:
+        return 1
+
+    print("\n".join(summarize(results)))
+    pieces = sum(stats.pieces for stats in results)
+    print(f"{len(results)} games, {pieces} pieces in {elapsed:.2f}s "
+          f"({len(results) / max(elapsed, 1e-9):.1f} games/s, "
+          f"{pieces / max(elapsed, 1e-9):.0f} pieces/s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
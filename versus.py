@@ -0,0 +1,206 @@
+import queue
+import random
+import struct
+
+from pieces import (PIECE_TYPES, MIN_BOARD_SIZE, MAX_BOARD_WIDTH, MAX_BOARD_HEIGHT,
+                    build_piece_table)
+
+# Versus messages between two players. Each payload starts with its type;
+# LoopbackLink passes payloads in process and netplay.py carries them over TCP.
+HELLO = 1  # player name (utf-8) after width and height
+READY = 2  # ready for the next round
+START = 3  # the round's seed; both players get the same pieces
+BOARD = 4  # board delta, see BoardSync
+GARBAGE = 5  # rows sent to the opponent
+TOPPED_OUT = 6  # the sender lost the round
+BYE = 7  # the opponent left (also queued locally when the connection drops)
+
+HELLO_HEADER = struct.Struct('<BHH')
+START_MSG = struct.Struct('<BI')
+GARBAGE_MSG = struct.Struct('<BB')
+# score, lines, first changed row, changed row count, piece index (0 for
+# none), rotation, piece row and column; the changed rows follow as
+# little-endian bitmasks of (width + 7) // 8 bytes each
+BOARD_HEADER = struct.Struct('<BIHHHBBhh')
+
+# Rows sent for clearing 0-4 lines at once
+GARBAGE_LINES = (0, 0, 1, 2, 4)
+
+
+class VersusError(Exception):
+    # A payload from the opponent that doesn't describe a valid board
+    pass
+
+
+def hello(name, width, height):
+    return HELLO_HEADER.pack(HELLO, width, height) + name.encode()[:32]
+
+
+def start(seed):
+    return START_MSG.pack(START, seed)
+
+
+def garbage(count):
+    return GARBAGE_MSG.pack(GARBAGE, min(count, 255))
+
+
+def message(kind):
+    return bytes([kind])
+
+
+class BoardSync:
+    # Builds BOARD deltas for one engine: the span of rows that differ from
+    # what was last sent plus the active piece, or None when nothing changed
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.sent = None
+        self._key = None
+
+    def delta(self, engine):
+        o = engine.orientation
+        key = (engine.board_version, o, engine.current_pos[0], engine.current_pos[1], engine.score)
+        if key == self._key:
+            return None
+        self._key = key
+        rows = engine.rows
+        sent = self.sent
+        if sent is None or len(sent) != len(rows):
+            first, last = 0, len(rows) - 1
+        else:
+            first = 0
+            while first < len(rows) and rows[first] == sent[first]:
+                first += 1
+            last = len(rows) - 1
+            while last >= first and rows[last] == sent[last]:
+                last -= 1
+        self.sent = rows[:]
+        count = last - first + 1 if last >= first else 0
+        row_bytes = (engine.width + 7) // 8
+        data = bytearray(BOARD_HEADER.pack(
+            BOARD, engine.score, engine.lines_cleared & 0xffff, first, count,
+            o.index if o else 0, o.rotation if o else 0, engine.current_pos[0],
+            engine.current_pos[1]))
+        for y in range(first, first + count):
+            data += rows[y].to_bytes(row_bytes, 'little')
+        return bytes(data)
+
+
+class OpponentState:
+    # The opponent's board as rebuilt from their BOARD deltas
+    def __init__(self, name, width, height):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.rows = [0] * height
+        self.pieces = build_piece_table(width)
+        self.orientation = None
+        self.pos = (0, 0)
+        self.score = 0
+        self.lines = 0
+
+    @classmethod
+    def from_hello(cls, payload):
+        # Raises VersusError for a board size this game couldn't play
+        width, height = check_hello(payload)
+        name = payload[HELLO_HEADER.size:].decode(errors='replace') or '?'
+        return cls(name, width, height)
+
+    def apply(self, payload):
+        # Raises VersusError, leaving the board as it was, for a delta that
+        # doesn't fit it
+        if len(payload) < BOARD_HEADER.size:
+            raise VersusError("Truncated board update")
+        (_, score, lines, first, count, piece, rotation,
+         row, col) = BOARD_HEADER.unpack_from(payload)
+        row_bytes = (self.width + 7) // 8
+        if first + count > self.height or len(payload) < BOARD_HEADER.size + count * row_bytes:
+            raise VersusError(f"Bad board rows {first}+{count}")
+        if not 0 <= piece <= len(PIECE_TYPES):
+            raise VersusError(f"Bad piece {piece}")
+        o = self.pieces[PIECE_TYPES[piece - 1]][rotation & 3] if piece else None
+        if o and not (0 <= row <= self.height - o.height and 0 <= col <= self.width - o.width):
+            raise VersusError(f"Piece outside the board at ({row}, {col})")
+        full = (1 << self.width) - 1
+        pos = BOARD_HEADER.size
+        rows = self.rows
+        for y in range(first, first + count):
+            rows[y] = int.from_bytes(payload[pos:pos + row_bytes], 'little') & full
+            pos += row_bytes
+        self.score = score
+        self.lines = lines
+        self.orientation = o
+        self.pos = (row, col)
+
+
+def check_hello(payload):
+    # The (width, height) a HELLO announces, if the board sizes allow them
+    if len(payload) < HELLO_HEADER.size or payload[0] != HELLO:
+        raise VersusError("Not a HELLO")
+    _, width, height = HELLO_HEADER.unpack_from(payload)
+    if not (MIN_BOARD_SIZE <= width <= MAX_BOARD_WIDTH
+            and MIN_BOARD_SIZE <= height <= MAX_BOARD_HEIGHT):
+        raise VersusError(f"Unsupported board size {width}x{height}")
+    return width, height
+
+
+class Match:
+    # Round bookkeeping shared by the server and the loopback pair. receive()
+    # takes a payload from player 0 or 1 and returns the (player, payload)
+    # deliveries it causes: a START for both once both are READY, otherwise
+    # the payload relayed to the opponent.
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.ready = [False, False]
+
+    def receive(self, side, payload):
+        if payload[:1] == bytes([READY]):
+            self.ready[side] = True
+            if not all(self.ready):
+                return []
+            self.ready = [False, False]
+            msg = start(self.rng.getrandbits(32))
+            return [(0, msg), (1, msg)]
+        return [(1 - side, payload)]
+
+
+class LoopbackLink:
+    # In-process stand-in for netplay.VersusLink; see loopback_pair()
+    def __init__(self, match, side):
+        self.match = match
+        self.side = side
+        self.peer = None
+        self.incoming = queue.SimpleQueue()
+
+    def send(self, payload):
+        for side, msg in self.match.receive(self.side, payload):
+            link = self if side == self.side else self.peer
+            if link:
+                link.incoming.put(msg)
+
+    def poll(self):
+        return drain(self.incoming)
+
+    def close(self):
+        if self.peer:
+            self.peer.incoming.put(message(BYE))
+            self.peer.peer = None
+        self.peer = None
+
+
+def loopback_pair(seed=None):
+    # Two linked players with no sockets or threads, for tests and local play
+    match = Match(seed)
+    a, b = LoopbackLink(match, 0), LoopbackLink(match, 1)
+    a.peer, b.peer = b, a
+    return a, b
+
+
+def drain(incoming):
+    payloads = []
+    while True:
+        try:
+            payloads.append(incoming.get_nowait())
+        except queue.Empty:
+            return payloads